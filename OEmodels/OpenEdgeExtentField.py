@@ -49,23 +49,325 @@ Utilization in django models :
     
     
 Unknown value are converted to these default values :
-date et datetime : 0/0/0001
+date et datetime : None
 int,int64 and dec : 0
 log : False
 char : No default value, unknow value returns a question mark (?).
     
     CAREFUL : You have to be aware that unknown values in characters type 
     fields may be confused with the real question mark character
+
+Date and datetime extents :
+
+    The dates are read in the date format of the session (-d startup
+    parameter), given by the database OPTIONS 'DATEFORMAT' ('mdy' by default,
+    'dmy', 'ymd'...) or by the OEdateformat argument of the field. The two
+    digit years are in 1950-2049 (-yy 1950). The datetime extents keep their
+    time part (mm/dd/yyyy hh:mm:ss.sss). The dates are written back in the
+    same format.
+
+    The parsed dates are cached (DATE_CACHE_SIZE), the period ends repeated
+    over the rows are parsed once.
+
+Extent element lookups :
+
+    An extent element is read on the server with PRO_ELEMENT(col, i, i), cast
+    to the type of the OEtype. The element index is 1 based, as in 4GL :
+
+        Mytable.objects.filter(intext__3__gt=1000)
+        Mytable.objects.filter(fieldext__1__startswith='ABC')
+
+        from OpenEdge.OEmodels.OpenEdgeExtentField import ExtentElement
+        Mytable.objects.annotate(third=ExtentElement(3, 'intext')).order_by('third')
+
+Lazy decoding :
+
+    fieldext = OpenEdgeExtentField(max_length=8, blank=True,OEextents=5,OEtype='char',OElazy=True)
+
+    The value read from the database is a LazyExtents, a list-like object
+    keeping the raw string. It is decoded on the first access (index,
+    iteration, len...), and saved back as the raw string while it is not
+    modified. Useful for the wide 4GL tables where most extents are not used.
+
+NumPy extents (numpy is optional) :
+
+    buckets = OpenEdgeExtentField(max_length=88, blank=True,OEextents=12,OEtype='dec',OEnumpy=True)
+
+    For the 'int', 'int64' and 'dec' types, the value is an ndarray of
+    OEextents items, int64 for 'int' and 'int64', float64 for 'dec'. Missing
+    and unknown values are 0. Cannot be combined with OElazy.
+
+    from OpenEdge.OEmodels.OpenEdgeExtentField import extent_matrix
+    matrix = extent_matrix(Sales.objects.filter(year=2020), 'buckets')
+
+    returns the extents of a whole result set as one 2-D ndarray (rows x
+    extents), parsed by numpy from the raw strings of the column without a
+    Python object per element. The field does not need OEnumpy for it.
+
+    float64 keeps 15 significant digits. The exact 'dec' values are asked for
+    explicitly, as an object matrix of Decimal (one Python object per element) :
+
+    matrix = extent_matrix(Sales.objects.filter(year=2020), 'buckets', dtype=object)
      
 '''
 from django.db import models
+from django.db.models import Transform
+from django.utils.functional import cached_property
 from django.utils.encoding import smart_str
 from django.core import exceptions
+from django.core.exceptions import ImproperlyConfigured
+from django.db.models.sql.constants import MULTI
 
 #===============================================================================
 # OeEdge Extents support import
 #===============================================================================
 import re,decimal,datetime
+from functools import lru_cache, partial
+try:
+    from collections.abc import MutableSequence
+except ImportError:
+    # Python 2
+    from collections import MutableSequence
+try:
+    import numpy as np
+except ImportError:
+    np = None
+
+#===============================================================================
+# Extent decoding
+#
+# The extents are split in a single pass : a value without escape char is a
+# plain split on ';', otherwise the tokens are an escaped char (~~ or ~;), a
+# separator or a run of plain chars. Each OEtype has its element converter,
+# chosen once by the field, '?' is the unknown value.
+#===============================================================================
+EXTENT_TOKEN = re.compile('~.?|;|[^~;]+', re.S)
+
+def split_extents(value):
+    """
+    Split a character extent value, the ~~ and ~; escapes are decoded.
+    """
+    if '~' not in value:
+        return value.split(';')
+    items = []
+    current = []
+    for token in EXTENT_TOKEN.findall(value):
+        if token == ';':
+            items.append(''.join(current))
+            current = []
+        elif token[0] == '~' and token[1:] in ('~', ';'):
+            current.append(token[1])
+        else:
+            current.append(token)
+    items.append(''.join(current))
+    return items
+
+def split_plain(value):
+    """
+    Split a numeric, logical or date extent value, no escape in these.
+    """
+    return value.split(';')
+
+class LazyExtents(MutableSequence):
+    """
+    Extent values decoded on first access, see OElazy.
+    """
+    __slots__ = ('raw', 'field', 'dateformat', 'modified', '_items')
+
+    def __init__(self, raw, field, dateformat=None):
+        self.raw = raw
+        self.field = field
+        self.dateformat = dateformat
+        self.modified = False
+        self._items = None
+
+    def _decoded(self):
+        # The list is only reached through the MutableSequence methods, which
+        # set the modified flag
+        if self._items is None:
+            self._items = self.field.to_python(self.raw, self.dateformat)
+        return self._items
+
+    def __getitem__(self, index):
+        return self._decoded()[index]
+
+    def __setitem__(self, index, value):
+        self._decoded()[index] = value
+        self.modified = True
+
+    def __delitem__(self, index):
+        del self._decoded()[index]
+        self.modified = True
+
+    def __len__(self):
+        return len(self._decoded())
+
+    def insert(self, index, value):
+        self._decoded().insert(index, value)
+        self.modified = True
+
+    def __eq__(self, other):
+        if isinstance(other, LazyExtents):
+            other = other._decoded()
+        return self._decoded() == other
+
+    def __ne__(self, other):
+        return not self == other
+
+    __hash__ = None
+
+    def __repr__(self):
+        return repr(self._decoded())
+
+    def __reduce__(self):
+        return list, (list(self._decoded()),)
+
+def split_numbers(value):
+    """
+    Split a numeric extent value, the unknown value is 0 : the elements are
+    given as is to int() or Decimal().
+    """
+    return value.replace('?', '0').split(';')
+
+def convert_log(item):
+    return False if item == '?' else bool(int(item))
+
+#===============================================================================
+# Date and datetime elements
+#
+# Parsed in the date format of the session, cached as a small set of dates
+# (period ends...) is repeated over the rows. '?' is None.
+#===============================================================================
+DATE_CACHE_SIZE = 4096
+DATE_SEPARATOR = re.compile('[-/.]')
+# First year of the two digit years, the -yy startup parameter
+YEAR_OFFSET = 1950
+
+def date_parts(item, dateformat):
+    values = DATE_SEPARATOR.split(item)
+    if len(values) != 3:
+        raise ValueError("Invalid date %r" % item)
+    parts = dict(zip(dateformat, values))
+    year = int(parts['y'])
+    if year < 100 and len(parts['y']) <= 2:
+        year += YEAR_OFFSET - YEAR_OFFSET % 100
+        if year < YEAR_OFFSET:
+            year += 100
+    return year, int(parts['m']), int(parts['d'])
+
+@lru_cache(maxsize=DATE_CACHE_SIZE)
+def convert_date(item, dateformat='mdy'):
+    if item == '?':
+        return None
+    parts = item.split()
+    if not parts:
+        raise ValueError("Invalid date %r" % item)
+    return datetime.date(*date_parts(parts[0], dateformat))
+
+@lru_cache(maxsize=DATE_CACHE_SIZE)
+def convert_datetime(item, dateformat='mdy'):
+    if item == '?':
+        return None
+    parts = item.replace('T', ' ').split()
+    if not parts or len(parts) > 2:
+        raise ValueError("Invalid datetime %r" % item)
+    value = datetime.datetime(*date_parts(parts[0], dateformat))
+    if len(parts) > 1:
+        hms = parts[1].split(':')
+        if len(hms) not in (2, 3):
+            raise ValueError("Invalid datetime %r" % item)
+        seconds = decimal.Decimal(hms[2]) if len(hms) > 2 else 0
+        value = value.replace(hour=int(hms[0]), minute=int(hms[1]), second=int(seconds),
+                              microsecond=int((seconds % 1) * 1000000))
+    return value
+
+def format_date(value, dateformat='mdy'):
+    """
+    Date or datetime element in the date format of the session, as read by convert_date / convert_datetime.
+    """
+    parts = {'y':'%04d' % value.year, 'm':'%02d' % value.month, 'd':'%02d' % value.day}
+    text = '/'.join([parts[x] for x in dateformat])
+    if isinstance(value, datetime.datetime):
+        text += ' %02d:%02d:%02d.%03d' % (value.hour, value.minute, value.second, value.microsecond // 1000)
+    return text
+
+DATE_CONVERTERS = {'date':convert_date,
+                   'datetime':convert_datetime}
+
+#===============================================================================
+# NumPy extents
+#
+# The dtype of the numeric OEtypes, the 'dec' extents are read as float64.
+#===============================================================================
+NUMPY_TYPES = {'int':'int64',
+               'int64':'int64',
+               'dec':'float64'}
+
+def extent_matrix(queryset, field_name, dtype=None):
+    """
+    Returns the extents of field_name for the rows of queryset, as a 2-D ndarray (rows x extents).
+    dtype=object gives the exact Decimal or int elements, see to_matrix().
+    """
+    field = queryset.model._meta.get_field(field_name)
+    if not isinstance(field, OpenEdgeExtentField):
+        raise TypeError("%s is not an OpenEdgeExtentField" % field_name)
+    compiler = queryset.values_list(field_name).query.get_compiler(queryset.db)
+    # Raw strings of the column, from_db_value() is not run
+    return field.to_matrix([row[0] for rows in compiler.execute_sql(MULTI) for row in rows], dtype)
+
+#===============================================================================
+# Extent element transform
+#
+# PRO_ELEMENT returns a varchar, the element is cast to the SQL type of the
+# OEtype and read as the matching Django field.
+#===============================================================================
+ELEMENT_TYPES = {'char':(None, models.CharField),
+                 'clob':(None, models.TextField),
+                 'int':('INTEGER', models.IntegerField),
+                 'int64':('BIGINT', models.BigIntegerField),
+                 'dec':('DECIMAL(38,10)', models.DecimalField),
+                 'log':('INTEGER', models.BooleanField),
+                 'date':('DATE', models.DateField),
+                 'datetime':('TIMESTAMP', models.DateTimeField)}
+
+class ExtentElement(Transform):
+    """
+    Element index (1 based) of an OpenEdgeExtentField, PRO_ELEMENT(col, i, i).
+    """
+    function = 'PRO_ELEMENT'
+
+    def __init__(self, index, expression, **extra):
+        super(ExtentElement, self).__init__(expression, **extra)
+        self.index = int(index)
+
+    def as_sql(self, compiler, connection):
+        lhs, params = compiler.compile(self.lhs)
+        sql = '%s(%s, %d, %d)' % (self.function, lhs, self.index, self.index)
+        cast = ELEMENT_TYPES.get(self.extent_type, (None, None))[0]
+        if cast is not None:
+            sql = 'CAST(%s AS %s)' % (sql, cast)
+        return sql, params
+
+    @property
+    def extent_type(self):
+        return getattr(self.lhs.output_field, 'oetype', 'char')
+
+    @cached_property
+    def output_field(self):
+        field_class = ELEMENT_TYPES.get(self.extent_type, (None, models.CharField))[1]
+        if field_class is models.DecimalField:
+            return field_class(max_digits=38, decimal_places=10)
+        return field_class()
+
+class ExtentElementFactory(object):
+    """
+    Transform returned by get_transform() for an element index.
+    """
+    def __init__(self, index):
+        self.index = index
+
+    def __call__(self, *args, **kwargs):
+        return ExtentElement(self.index, *args, **kwargs)
 
 class OpenEdgeExtentField(models.Field):
     
@@ -97,6 +399,15 @@ class OpenEdgeExtentField(models.Field):
                   #=============================================================
                   'date':[datetime.date,'datefield',0]}
 
+    # Element converters of the non character types, see convert_* above.
+    # The date converters also take the date format, see get_converter()
+    oetypeconverters = {'int':int,
+                        'int64':int,
+                        'dec':decimal.Decimal,
+                        'log':convert_log,
+                        'date':convert_date,
+                        'datetime':convert_datetime}
+
     # deprecated #EDRAS
     # __metaclass__ = models.SubfieldBase
 
@@ -125,25 +436,80 @@ class OpenEdgeExtentField(models.Field):
         if 'OEtype' in kwargs:
             self.oeconvfield=self.oetypedict[self.oetype][0]
             kwargs.pop('OEtype')
+
+        #=======================================================================
+        # Splitter and element converter of the OEtype
+        #=======================================================================
+        self.split_extents = split_plain
+        if self.oetype in ('int', 'int64', 'dec'):
+            self.split_extents = split_numbers
+        self.convert_extent = self.oetypeconverters.get(self.oetype)
+        if self.convert_extent is None:
+            self.split_extents = split_extents
             
         if 'OEextents' in kwargs:
             self.extents = kwargs['OEextents']
             kwargs.pop('OEextents')
+
+        self.lazy = kwargs.pop('OElazy', False)
+        self.numpy = kwargs.pop('OEnumpy', False)
+        self.dateformat = kwargs.pop('OEdateformat', None)
+        if self.dateformat is not None and sorted(self.dateformat) != ['d', 'm', 'y']:
+            raise ImproperlyConfigured("Invalid OEdateformat %r for %s" % (self.dateformat, self.name))
+        if self.numpy:
+            self.numpy_dtype()
+            if self.lazy:
+                raise ImproperlyConfigured("OElazy and OEnumpy cannot be combined for %s" % self.name)
             
         if self.oetypedict[self.oetype][2] > 0 :
             kwargs['max_length'] = self.oetypedict[self.oetype][2]
         
         super(OpenEdgeExtentField, self).__init__(*args, **kwargs)
 
+    def get_transform(self, name):
+        """
+        A digit lookup name is the index (1 based) of an element, see ExtentElement.
+        """
+        transform = super(OpenEdgeExtentField, self).get_transform(name)
+        if transform is not None:
+            return transform
+        if name.isdigit() and 1 <= int(name) and (not self.extents or int(name) <= self.extents):
+            return ExtentElementFactory(int(name))
+        return None
+
+    def numpy_dtype(self):
+        """
+        Returns the numpy dtype of the extents, see NUMPY_TYPES.
+        """
+        if np is None:
+            raise ImproperlyConfigured("NumPy extents of %s need the numpy package" % self.name)
+        if self.oetype not in NUMPY_TYPES or not self.extents:
+            raise ImproperlyConfigured("NumPy extents of %s need a numeric OEtype and OEextents" % self.name)
+        return NUMPY_TYPES[self.oetype]
+
+    def get_converter(self, dateformat=None):
+        """
+        Returns the element converter, the date ones bound to the date format.
+        """
+        if self.oetype in DATE_CONVERTERS:
+            return partial(DATE_CONVERTERS[self.oetype], dateformat=self.dateformat or dateformat or 'mdy')
+        return self.convert_extent
+
     # EDRAS -> added var connection
     def db_type(self, connection):
         return self.oetypedict[self.oetype][1]
 
     # #EDRAS -> included from_db_value when retrieving data from DB
     def from_db_value(self, value, expression, connection):
-        return self.to_python(value)
+        dateformat = getattr(connection, 'date_format', None)
+        if self.lazy and isinstance(value, str) and value != '':
+            return LazyExtents(value, self, dateformat)
+        return self.to_python(value, dateformat)
+
+    def to_python(self, value, dateformat=None):
+        if self.numpy and isinstance(value, (str, type(None))):
+            return self.to_matrix([value])[0]
 
-    def to_python(self, value):
         if value is None or value == '':
             return []
 
@@ -152,49 +518,109 @@ class OpenEdgeExtentField(models.Field):
         #     value=smart_str(value)
         
         if isinstance(value, str):
-            if self.oetype == 'date' :
-                try: 
-                    return [ datetime.date(int(u[2]),int(u[0]),int(u[1])) for u in [ z.split('/') for z in re.split(';',value.replace('?','01/01/01')) ]]
-                except (ValueError, TypeError):
-                    raise exceptions.ValidationError("Invalid %s format conversion for %s in a OpenEdgeExtentField instance")%(self.oetype,self.name)
-                
-            elif self.oetype == 'datetime':
-                try:
-                    return [ datetime.date(int(u[2]),int(u[0]),int(u[1])) for u in [ z.split('/') for z in re.split(';',value.replace('?','01/01/01')) ]]
-                except (ValueError, TypeError):
-                    raise exceptions.ValidationError("Invalid %s format conversion for %s in a OpenEdgeExtentField instance")%(self.oetype,self.name)
-            
-            elif self.oetype == 'log':
-                try:
-                    return [ self.oeconvfield(int(y))
-                            for y in re.split(';',value.replace('?','0'))
-                            ]
-                except (ValueError, TypeError):
-                    raise exceptions.ValidationError("Invalid %s format conversion for %s in a OpenEdgeExtentField instance")%(self.oetype,self.name)
-            
-            elif self.oetype in ['int','int64','dec']:
-                try:
-                    return [ self.oeconvfield(y) 
-                            for y in re.split(';',value.replace('?','0'))
-                            ]
-                except (ValueError, TypeError):
-                    raise exceptions.ValidationError("Invalid %s format conversion for %s in a OpenEdgeExtentField instance")%(self.oetype,self.name)
-                
-            else:
-                try:
-                    return [ self.oeconvfield(re.sub('<SEMICOLON>',';',y)) for y in [re.sub('<TILDE>','~', x) for x in re.split(';',re.sub('~~','<TILDE>',re.sub('~;','<SEMICOLON>',value)))]]
-                except (ValueError, TypeError):
-                    raise exceptions.ValidationError("Invalid %s format conversion for %s in a OpenEdgeExtentField instance")%(self.oetype,self.name)
+            items = self.split_extents(value)
+            convert = self.get_converter(dateformat)
+            if convert is None:
+                return items
+            try:
+                return list(map(convert, items))
+            except (ValueError, TypeError, decimal.InvalidOperation):
+                raise exceptions.ValidationError("Invalid %s format conversion for %s in a OpenEdgeExtentField instance"%(self.oetype,self.name))
         
         elif isinstance(value,list):
             if len(value) > self.extents:
                 raise exceptions.ValidationError("Invalid extents count for %s in a OpenEdgeExtentField instance"%self.name)
             return value
+
+        elif isinstance(value,LazyExtents):
+            return value
+
+        elif np is not None and isinstance(value, np.ndarray):
+            if value.ndim != 1 or len(value) > self.extents:
+                raise exceptions.ValidationError("Invalid extents count for %s in a OpenEdgeExtentField instance"%self.name)
+            return value
+
+    def to_python_many(self, values, dateformat=None):
+        """
+        Decode a whole fetched column at once, returns the list of extent lists.
+        """
+        if self.numpy:
+            return list(self.to_matrix(values))
+        split = self.split_extents
+        convert = self.get_converter(dateformat)
+        result = []
+        append = result.append
+        try:
+            for value in values:
+                if value is None or value == '':
+                    append([])
+                elif not isinstance(value, str):
+                    append(self.to_python(value, dateformat))
+                elif convert is None:
+                    append(split(value))
+                else:
+                    append(list(map(convert, split(value))))
+        except (ValueError, TypeError, decimal.InvalidOperation):
+            raise exceptions.ValidationError("Invalid %s format conversion for %s in a OpenEdgeExtentField instance"%(self.oetype,self.name))
+        return result
+
+    def to_matrix(self, values, dtype=None):
+        """
+        Decode the raw strings of a column into a 2-D ndarray (rows x extents).
+        The missing extents are padded with 0, the strings are parsed at once.
+        dtype=object converts each element with the converter of the OEtype.
+        """
+        dtype = np.dtype(dtype or self.numpy_dtype())
+        extents = self.extents
+        empty = ';'.join(['0'] * extents)
+        rows = []
+        append = rows.append
+        for value in values:
+            if not value:
+                append(empty)
+                continue
+            missing = extents - value.count(';') - 1
+            if missing < 0:
+                raise exceptions.ValidationError("Invalid extents count for %s in a OpenEdgeExtentField instance"%self.name)
+            append(value + ';0' * missing if missing else value)
+        if not rows:
+            return np.zeros((0, extents), dtype=dtype)
+        data = ';'.join(rows).replace('?', '0')
+        try:
+            if dtype.kind == 'O':
+                matrix = np.array(list(map(self.convert_extent, data.split(';'))), dtype=dtype)
+            else:
+                # One C level pass, a bad element raises a ValueError (numpy >= 2)
+                matrix = np.fromstring(data, dtype=dtype, sep=';')
+        except (ValueError, TypeError, decimal.InvalidOperation):
+            raise exceptions.ValidationError("Invalid %s format conversion for %s in a OpenEdgeExtentField instance"%(self.oetype,self.name))
+        if matrix.size != len(rows) * extents:
+            raise exceptions.ValidationError("Invalid %s format conversion for %s in a OpenEdgeExtentField instance"%(self.oetype,self.name))
+        return matrix.reshape(len(rows), extents)
         
         
-    def get_prep_value(self, value):
+    def get_db_prep_value(self, value, connection, prepared=False):
+        if prepared:
+            return value
+        return self.get_prep_value(value, getattr(connection, 'date_format', None))
+
+    def get_prep_value(self, value, dateformat=None):
+        if isinstance(value, LazyExtents) and not value.modified:
+            # Unchanged since read, no decode / encode cycle
+            return value.raw
+        if np is not None and isinstance(value, np.ndarray):
+            if value.dtype.kind == 'f':
+                # No exponent notation for the decimal extents
+                value = [np.format_float_positional(x, trim='-') for x in value]
+            else:
+                value = value.tolist()
         if len(value) > self.extents:
             raise exceptions.ValidationError("Invalid extents count in %s for a OpenEdgeExtentField instance"%self.name)
         
-        return ';'.join([ smart_str(x).replace('~','~~').replace(';','~;') for x in value ])       
+        if self.oetype in DATE_CONVERTERS:
+            dateformat = self.dateformat or dateformat or 'mdy'
+            value = [format_date(x, dateformat) if isinstance(x, datetime.date) else x for x in value]
+
+        # None is the unknown value
+        return ';'.join([ '?' if x is None else smart_str(x).replace('~','~~').replace(';','~;') for x in value ])       
         
@@ -0,0 +1,157 @@
+# -*- coding: utf-8 -*-
+'''
+Keyset (seek) pagination for OpenEdge
+
+A queryset slice with an offset is sent as OFFSET n ROWS FETCH NEXT m ROWS ONLY,
+OpenEdge has to read and discard the n first rows, so the deep pages of a large
+table get slower and slower.
+
+The keyset paginator remembers the ordering values of the last row of a page
+and reads the next page with :
+
+    WHERE (c1 > v1) OR (c1 = v1 AND c2 > v2) OR ...  ORDER BY c1, c2, ...
+
+sent with SELECT TOP m, each page costs the same whatever its position.
+
+Utilization :
+
+    from OpenEdge.OEmodels.OpenEdgePaginator import OpenEdgeKeysetPaginator
+
+    paginator = OpenEdgeKeysetPaginator(Customer.objects.all(), 50, ordering=('-created', 'name'))
+    page = paginator.page()
+    ...
+    page = paginator.page(after=page.next_key)
+
+    OR in a view, with the key passed in the query string :
+
+    page = paginator.page(after=paginator.decode_key(request.GET.get('after')))
+    next_url = '?after=%s' % paginator.encode_key(page.next_key)
+
+    ordering is a list of field names, prefixed with '-' for a descending order,
+    ASC and DESC can be mixed. It defaults to the ordering of the queryset, then
+    of the model. The primary key is added when missing, the ordering has to be
+    unique for the seek to be exact.
+
+    CAREFUL : The ordering fields must not be NULL, and must be fields of the
+    model (use 'author_id', not 'author' or 'author__name').
+'''
+from django.core.paginator import InvalidPage
+from django.core import signing
+from django.db.models import Q
+
+
+class KeysetPage(object):
+    """
+    One page of a keyset pagination.
+    """
+    def __init__(self, object_list, next_key, paginator):
+        self.object_list = object_list
+        self.next_key = next_key
+        self.paginator = paginator
+
+    def has_next(self):
+        return self.next_key is not None
+
+    def __len__(self):
+        return len(self.object_list)
+
+    def __iter__(self):
+        return iter(self.object_list)
+
+    def __getitem__(self, index):
+        return self.object_list[index]
+
+    def __repr__(self):
+        return '<KeysetPage after %r>' % (self.next_key,)
+
+
+class OpenEdgeKeysetPaginator(object):
+    """
+    Pages through a queryset with WHERE clauses on the ordering key instead of OFFSET.
+    """
+    def __init__(self, queryset, per_page, ordering=None):
+        self.queryset = queryset
+        self.per_page = int(per_page)
+        self.ordering = self.get_ordering(queryset, ordering)
+
+    def get_ordering(self, queryset, ordering):
+        """
+        Returns the ordering as a tuple of (attname, descending), the primary key ends it.
+        """
+        opts = queryset.model._meta
+        if not ordering:
+            ordering = queryset.query.order_by or opts.ordering
+        result = []
+        for name in ordering:
+            if not isinstance(name, str) or name == '?' or '__' in name:
+                raise ValueError("Keyset pagination needs an ordering on fields of %s, got %r" % (opts.object_name, name))
+            descending = name.startswith('-')
+            name = name.lstrip('-+')
+            if name == 'pk':
+                name = opts.pk.attname
+            else:
+                name = opts.get_field(name).attname
+            result.append((name, descending))
+        if opts.pk.attname not in [name for name, _ in result]:
+            result.append((opts.pk.attname, result[-1][1] if result else False))
+        return tuple(result)
+
+    def seek_filter(self, key):
+        """
+        Returns the Q object selecting the rows after key in the ordering.
+        """
+        if len(key) != len(self.ordering):
+            raise InvalidPage("Invalid keyset pagination key %r" % (key,))
+        seek = Q()
+        equal = {}
+        for (name, descending), value in zip(self.ordering, key):
+            seek |= Q(**equal) & Q(**{'%s__%s' % (name, 'lt' if descending else 'gt'): value})
+            equal[name] = value
+        return seek
+
+    def key_of(self, obj):
+        """
+        Returns the ordering key of a row.
+        """
+        return tuple(getattr(obj, name) for name, _ in self.ordering)
+
+    def page(self, after=None):
+        """
+        Returns the page following the key after, the first page when after is None.
+        """
+        queryset = self.queryset.order_by(*['%s%s' % ('-' if descending else '', name)
+                                            for name, descending in self.ordering])
+        if after is not None:
+            queryset = queryset.filter(self.seek_filter(after))
+        # One more row to know if there is a next page, sent as SELECT TOP
+        object_list = list(queryset[:self.per_page + 1])
+        next_key = None
+        if len(object_list) > self.per_page:
+            object_list = object_list[:self.per_page]
+            next_key = self.key_of(object_list[-1])
+        return KeysetPage(object_list, next_key, self)
+
+    def encode_key(self, key):
+        """
+        Returns the key as a signed string for an URL.
+        """
+        if key is None:
+            return ''
+        return signing.dumps([str(v) for v in key], compress=True)
+
+    def decode_key(self, value):
+        """
+        Returns the key from the string made by encode_key(), None for an empty value.
+        """
+        if not value:
+            return None
+        try:
+            values = signing.loads(value)
+        except signing.BadSignature:
+            raise InvalidPage("Invalid keyset pagination key")
+        opts = self.queryset.model._meta
+        fields = dict((f.attname, f) for f in opts.concrete_fields)
+        try:
+            return tuple(fields[name].to_python(v) for (name, _), v in zip(self.ordering, values))
+        except Exception:
+            raise InvalidPage("Invalid keyset pagination key")
@@ -0,0 +1,179 @@
+# -*- coding: utf-8 -*-
+'''
+QuerySet and Manager with the OpenEdge specific options
+
+Utilization in django models :
+
+    from OpenEdge.OEmodels.OpenEdgeQuerySet import OpenEdgeManager
+
+    class Customer(models.Model):
+        ...
+        objects = OpenEdgeManager()
+
+        # Optional, the default hints of the model
+        OEhints = {'nolock': False, 'index': 'CustNum'}
+
+    Customer.objects.with_hints(nolock=True)                  # dirty read, for the reporting screens
+    Customer.objects.with_hints(nolock=False)                 # consistent read
+    Customer.objects.with_hints(readpast=True)                # skip the locked rows (READPAST NOWAIT)
+    Customer.objects.with_hints(readpast=5)                   # READPAST WAIT 5
+    Customer.objects.with_hints(index='CustNum')              # WITH (INDEX (CustNum)) on the customer table
+    Order.objects.filter(customer__name='x').with_hints(index={'order': 'OrderDate', 'customer': 'Name'})
+
+    The hints not given keep the value of the model (OEhints) or of the
+    database OPTIONS ('NOLOCK', default True, and 'READPAST').
+    NOLOCK and READPAST exclude each other.
+
+OR to UNION rewrite :
+
+    The OpenEdge optimizer often scans the whole table for WHERE a = ? OR b = ?
+    even when both columns are indexed.
+
+    Customer.objects.filter(Q(name__startswith='Lift') | Q(phone='555')).or_to_union()
+
+    is sent as one SELECT per OR branch, each branch can use its index. The
+    branches are joined by UNION when the rows are distinct (primary key or
+    unique column selected, distinct()), otherwise by UNION ALL with each
+    branch excluding the rows of the previous ones, so the result is the one
+    of the OR form. Applies to the single table queries whose WHERE clause is
+    an OR (or an AND containing one OR) of column lookups, without slice,
+    ordered by selected columns. The other queries are sent unchanged.
+
+Batched DELETE and UPDATE :
+
+    A single DELETE or UPDATE of millions of rows takes a record lock per row
+    and can overflow the lock table of the server (-L). In batched mode the
+    rows are processed by ranges of primary keys, with a commit after each
+    range, so the locks held stay bounded.
+
+    Order.objects.filter(status='closed').delete(batch_size=5000)
+    Order.objects.filter(status='open').batch_update(5000, status='closed')
+
+    def report(rows, batches):
+        print('%d rows in %d batches' % (rows, batches))
+    Order.objects.filter(status='closed').delete(batch_size=5000, progress=report)
+
+    The default batch sizes are taken from the database OPTIONS
+    'DELETE_BATCH_SIZE' and 'UPDATE_BATCH_SIZE' (delete() and update() are then
+    batched). progress is called after each batch with the count of rows
+    processed and of batches done.
+
+    CAREFUL : Inside a transaction.atomic() block the commits only happen at
+    the end of the block, the locks are not released between the batches.
+
+Extent matrix :
+
+    Sales.objects.filter(year=2020).extent_matrix('buckets')
+
+    returns the extents of an OpenEdgeExtentField of numeric OEtype as a 2-D
+    numpy ndarray (rows x extents), see OpenEdgeExtentField.extent_matrix.
+'''
+from django.db import connections, models, transaction
+
+from .OpenEdgeExtentField import extent_matrix
+
+
+class OpenEdgeQuerySet(models.QuerySet):
+
+    def with_hints(self, nolock=None, readpast=None, index=None):
+        """
+        Returns a new QuerySet read with the given lock and index hints.
+        """
+        if nolock and readpast:
+            raise ValueError("NOLOCK and READPAST hints cannot be combined.")
+        clone = self._chain()
+        hints = dict(getattr(clone.query, 'oe_hints', {}))
+        if nolock is not None:
+            hints['nolock'] = nolock
+            if nolock:
+                hints['readpast'] = False
+        if readpast is not None:
+            hints['readpast'] = readpast
+            if readpast:
+                hints['nolock'] = False
+        if index is not None:
+            hints['index'] = index
+        clone.query.oe_hints = hints
+        return clone
+
+    def or_to_union(self, enabled=True):
+        """
+        Returns a new QuerySet whose top level OR is sent as a UNION of SELECT.
+        """
+        clone = self._chain()
+        clone.query.oe_or_union = enabled
+        return clone
+
+    def _batch_size(self, option):
+        return connections[self.db].settings_dict.get('OPTIONS', {}).get(option)
+
+    def _pk_ranges(self, batch_size):
+        """
+        Yields the (first, last) primary keys of the successive batches of rows.
+        """
+        queryset = self.order_by('pk').values_list('pk', flat=True)
+        last = None
+        while True:
+            batch = queryset if last is None else queryset.filter(pk__gt=last)
+            pks = list(batch[:batch_size])
+            if not pks:
+                return
+            yield pks[0], pks[-1]
+            if len(pks) < batch_size:
+                return
+            last = pks[-1]
+
+    def delete(self, batch_size=None, progress=None):
+        """
+        Deletes the records, by batches of batch_size rows with a commit after each one.
+        """
+        batch_size = batch_size or self._batch_size('DELETE_BATCH_SIZE')
+        if not batch_size or self.query.low_mark or self.query.high_mark is not None:
+            return super(OpenEdgeQuerySet, self).delete()
+        deleted, rows_count, batches = 0, {}, 0
+        for first, last in self._pk_ranges(batch_size):
+            with transaction.atomic(using=self.db, savepoint=False):
+                count, counts = models.QuerySet.delete(self.filter(pk__gte=first, pk__lte=last))
+            deleted += count
+            for label, n in counts.items():
+                rows_count[label] = rows_count.get(label, 0) + n
+            batches += 1
+            if progress is not None:
+                progress(deleted, batches)
+        return deleted, rows_count
+    delete.alters_data = True
+    delete.queryset_only = True
+
+    def update(self, **kwargs):
+        """
+        Updates the records, by batches when the OPTIONS 'UPDATE_BATCH_SIZE' is set.
+        """
+        batch_size = self._batch_size('UPDATE_BATCH_SIZE')
+        if not batch_size or self.query.low_mark or self.query.high_mark is not None:
+            return super(OpenEdgeQuerySet, self).update(**kwargs)
+        return self.batch_update(batch_size, **kwargs)
+    update.alters_data = True
+
+    def batch_update(self, batch_size, progress=None, **kwargs):
+        """
+        Updates the records by batches of batch_size rows with a commit after
+        each one. Returns the count of rows updated.
+        """
+        updated, batches = 0, 0
+        for first, last in self._pk_ranges(batch_size):
+            with transaction.atomic(using=self.db, savepoint=False):
+                updated += models.QuerySet.update(self.filter(pk__gte=first, pk__lte=last), **kwargs)
+            batches += 1
+            if progress is not None:
+                progress(updated, batches)
+        return updated
+    batch_update.alters_data = True
+
+    def extent_matrix(self, field_name, dtype=None):
+        """
+        Returns the extents of field_name as a 2-D ndarray (rows x extents).
+        """
+        return extent_matrix(self, field_name, dtype)
+
+
+OpenEdgeManager = models.Manager.from_queryset(OpenEdgeQuerySet)
@@ -1,3 +1,25 @@
+# -*- coding: utf-8 -*-
+'''
+OpenEdge adaptation of the Django aggregates
+
+The compiler calls the as_openedge() method of an expression when it exists
+(connection.vendor is 'openedge'), they are added here to the Django classes.
+
+    Avg : AVG(CAST(x AS FLOAT)), OpenEdge AVG of an integer column is an integer.
+    Variance, StdDev : OpenEdge has no statistical aggregate, they are composed
+    server side from SUM and COUNT :
+
+        VAR_POP  = (SUM(x * x) - SUM(x) * SUM(x) / COUNT(x)) / COUNT(x)
+        VAR_SAMP = (SUM(x * x) - SUM(x) * SUM(x) / COUNT(x)) / (COUNT(x) - 1)
+        STDDEV   = SQRT(VAR)
+
+    NULLIF returns NULL for an empty set (and for VAR_SAMP of a single row) as
+    the native functions do.
+'''
+from django.db.models import Avg, Case, FloatField, StdDev, Variance, When
+
+from django.db.backends.OpenEdge.operations import FIELD_SQL, repeat_field_sql
+
 #===============================================================================
 # from django.db.models.sql.aggregates import *
 # 
@@ -20,3 +42,44 @@
 #     sql_function = 'AVG'
 #     sql_template = '%(function)s(Convert(FLOAT, %(field)s))'
 #===============================================================================
+
+# x is repeated, its parameters are repeated by repeat_field_sql()
+VARIANCE_TEMPLATE = ('((SUM(%(x)s * %(x)s) - SUM(%(x)s) * SUM(%(x)s) / NULLIF(COUNT(%(x)s), 0))'
+                     ' / NULLIF(COUNT(%(x)s)%(ddof)s, 0))')
+
+
+def avg_as_openedge(self, compiler, connection, **extra_context):
+    """
+    AVG of the float value of an integer column, the decimal ones are kept.
+    """
+    if isinstance(self.output_field, FloatField):
+        extra_context['template'] = '%(function)s(%(distinct)sCAST(%(expressions)s AS FLOAT))'
+        extra_context.setdefault('distinct', '')
+    return self.as_sql(compiler, connection, **extra_context)
+
+
+def variance_sql(aggregate, compiler, sample):
+    """
+    Returns the SQL of the variance of the source of aggregate, and its parameters.
+    """
+    source = aggregate.get_source_expressions()[0]
+    if aggregate.filter:
+        source = Case(When(aggregate.filter, then=source))
+    x_sql, x_params = compiler.compile(source)
+    sql = VARIANCE_TEMPLATE % {'x': 'CAST(%s AS FLOAT)' % FIELD_SQL, 'ddof': ' - 1' if sample else ''}
+    return repeat_field_sql(sql, x_sql, x_params)
+
+
+def variance_as_openedge(self, compiler, connection, **extra_context):
+    return variance_sql(self, compiler, self.function.endswith('SAMP'))
+
+
+def stddev_as_openedge(self, compiler, connection, **extra_context):
+    # ABS : the rounding of a null variance can give a tiny negative value
+    sql, params = variance_sql(self, compiler, self.function.endswith('SAMP'))
+    return 'SQRT(ABS(%s))' % sql, params
+
+
+Avg.as_openedge = avg_as_openedge
+Variance.as_openedge = variance_as_openedge
+StdDev.as_openedge = stddev_as_openedge
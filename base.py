@@ -33,7 +33,10 @@ except ImportError as e:
     from django.core.exceptions import ImproperlyConfigured
     raise ImproperlyConfigured("Error loading pyodbc module: %s" % e)
 
+import codecs
+from collections import OrderedDict
 import re
+from functools import lru_cache
 
 
 m = re.match(r'(\d+)\.(\d+)\.(\d+)(?:-beta(\d+))?', Database.version)
@@ -103,6 +106,11 @@ from django.db.backends.OpenEdge.operations import DatabaseOperations
 from django.db.backends.OpenEdge.client import DatabaseClient
 from django.db.backends.OpenEdge.creation import DatabaseCreation
 from django.db.backends.OpenEdge.introspection import DatabaseIntrospection
+from django.db.backends.OpenEdge.pool import get_pool, StatementPool
+# Registers the as_openedge() methods of the aggregates
+from django.db.backends.OpenEdge import aggregates
+# and of the date functions
+from django.db.backends.OpenEdge import functions
 
 import os
 import warnings
@@ -129,9 +137,13 @@ for old, new in deprecated:
 DatabaseError = Database.DatabaseError
 IntegrityError = Database.IntegrityError
 
+# SQL_CURSOR_COMMIT_BEHAVIOR values of a driver keeping the prepared statements
+# on commit : CLOSE closes the cursors, PRESERVE keeps them open
+SQL_CB_CLOSE = 1
+SQL_CB_PRESERVE = 2
+
 class DatabaseFeatures(BaseDatabaseFeatures):
     uses_custom_query_class = True
-    can_use_chunked_reads = False
     can_return_id_from_insert = True
     ###can_return_id_from_insert = False
     #uses_savepoints = True
@@ -143,31 +155,110 @@ class DatabaseFeatures(BaseDatabaseFeatures):
     supports_sequence_reset = False
 
     
+    @property
+    def can_use_chunked_reads(self):
+        """
+        A streamed result set stays open while other statements are committed,
+        the driver has to preserve the cursors on commit. The cursor behaviors
+        are read by init_connection_state().
+        """
+        return self.connection.cursor_commit_behavior == SQL_CB_PRESERVE
+
+    @property
+    def can_reuse_prepared_statements(self):
+        """
+        The prepared statements of the pooled cursors survive the commits and
+        rollbacks only if the driver does not delete them.
+        """
+        behaviors = (self.connection.cursor_commit_behavior,
+                     self.connection.cursor_rollback_behavior)
+        return all(b in (SQL_CB_CLOSE, SQL_CB_PRESERVE) for b in behaviors)
+
     @cached_property
     def supports_transactions(self):
         "Confirm support for transactions"
-        try:
-            # Make sure to run inside a managed transaction block,
-            # otherwise autocommit will cause the confimation to
-            # fail.
-            self.connection.enter_transaction_management()
-            self.connection.managed(True)
-            cursor = self.connection.cursor()
-            cursor.execute('CREATE TABLE "ROLLBACK_TEST" (X INT)')
-            self.connection._commit()
-            cursor.execute('INSERT INTO "ROLLBACK_TEST" (X) VALUES (8)')
-            self.connection._rollback()
-            cursor.execute('SELECT COUNT(X) FROM "ROLLBACK_TEST"')
-            count, = cursor.fetchone()
-            cursor.execute('DROP TABLE "ROLLBACK_TEST"')
-            self.connection._commit()
-            self.connection._dirty = False
-        finally:
-            self.connection.leave_transaction_management()
+        if self.connection.commit_each_statement:
+            # Every statement is committed by the CursorWrapper
+            return False
+        cursor = self.connection.cursor()
+        cursor.execute('CREATE TABLE "ROLLBACK_TEST" (X INT)')
+        self.connection.set_autocommit(False)
+        cursor.execute('INSERT INTO "ROLLBACK_TEST" (X) VALUES (8)')
+        self.connection.rollback()
+        self.connection.set_autocommit(True)
+        cursor.execute('SELECT COUNT(X) FROM "ROLLBACK_TEST"')
+        count, = cursor.fetchone()
+        cursor.execute('DROP TABLE "ROLLBACK_TEST"')
         return count == 0
 
 
+class SessionState(object):
+    """
+    Remembers the session setup (default schema and DUAL table check) done on
+    a physical connection, so it is not redone for every cursor.
+    """
+    # SET SCHEMA, COMMIT and the SYSPROGRESS.SYSTABLES lookup of the DUAL table
+    SETUP_ROUND_TRIPS = 3
+
+    def __init__(self):
+        self.skipped_round_trips = 0
+        self.reset()
+
+    def reset(self):
+        self.connection = None
+        self.defschema = None
+        self.dual = None
+
+    def is_current(self, connection, defschema, dual):
+        """
+        Return True if the setup was already done on this connection with the
+        same DEFAULTSCHEMA and DUALTABLE settings.
+        """
+        return (connection is not None and self.connection is connection
+                and self.defschema == defschema and self.dual == dual)
+
+    def record(self, connection, defschema, dual):
+        self.connection = connection
+        self.defschema = defschema
+        self.dual = dual
+
+
+class SQLCache(object):
+    """
+    LRU cache of the SQL generated by the compiler, keyed by the shape of the
+    query (see SQLCompiler.get_cache_key). Used by one connection (thread).
+    """
+    def __init__(self, size):
+        self.size = size
+        self.hits = 0
+        self.misses = 0
+        self._entries = OrderedDict()
+
+    def get(self, key):
+        entry = self._entries.get(key)
+        if entry is None:
+            self.misses += 1
+        else:
+            self.hits += 1
+            self._entries.move_to_end(key)
+        return entry
+
+    def set(self, key, entry):
+        self._entries[key] = entry
+        self._entries.move_to_end(key)
+        if len(self._entries) > self.size:
+            self._entries.popitem(last=False)
+
+    def clear(self):
+        self._entries.clear()
+
+    def __len__(self):
+        return len(self._entries)
+
+
 class DatabaseWrapper(BaseDatabaseWrapper):
+    # as_openedge() methods of the expressions, see aggregates.py and functions.py
+    vendor = 'openedge'
     drv_name = None
     driver_needs_utf8 = True
     MARS_Connection = False
@@ -246,35 +337,72 @@ class DatabaseWrapper(BaseDatabaseWrapper):
 
         self.connection = None
         self.owner = None
+        self.session_state = SessionState()
+        self.pool = None
 
-    def _cursor(self):
-        new_conn = False
-        settings_dict = self.settings_dict
         #=======================================================================
-        # DSN=eslemien;HOST=localhost;DB=eslemien;UID=jyp;PWD=jyp;PORT=50000
+        # COMMIT_EACH_STATEMENT : compatibility with the former behavior, every
+        # statement is committed by the CursorWrapper, even in atomic() blocks
         #=======================================================================
-        db_str, user_str, passwd_str, port_str = None, None, "", None
+        options = self.settings_dict.get('OPTIONS', {})
+        self.commit_each_statement = options.get('COMMIT_EACH_STATEMENT', False)
+
+        # UNICODE_RESULTS : the driver already returns unicode, no transcoding
+        self.unicode_results = options.get('UNICODE_RESULTS', self.unicode_results)
+
+        #=======================================================================
+        # FETCH_SIZE : rows read by each fetchmany(), unless QuerySet.iterator()
+        # gives its own chunk_size. Streamed result sets are counted, the
+        # commits of the commit-per-statement mode wait for them to be closed.
+        #=======================================================================
+        self.fetch_size = options.get('FETCH_SIZE', 100)
+        self.open_streams = 0
+        self.commit_pending = False
+        # SQL_CURSOR_COMMIT / ROLLBACK_BEHAVIOR of the driver, see init_connection_state()
+        self.cursor_commit_behavior = None
+        self.cursor_rollback_behavior = None
+
+        #=======================================================================
+        # FAST_EXECUTEMANY : bulk inserts use the pyodbc parameter array binding,
+        # disabled for the connection when the driver rejects it.
+        # BULK_CHUNK_SIZE : rows formatted and sent by each executemany() call
+        #=======================================================================
+        self.fast_executemany = options.get('FAST_EXECUTEMANY', False)
+        self.bulk_chunk_size = options.get('BULK_CHUNK_SIZE', 1000)
+
+        #=======================================================================
+        # SQL_CACHE_SIZE : count of compiled SELECT statements kept by the
+        # connection and reused for the queries of the same shape, 0 disables
+        # the cache. Statistics in connection.sql_cache.hits / misses
+        #=======================================================================
+        sql_cache_size = options.get('SQL_CACHE_SIZE', 0)
+        self.sql_cache = SQLCache(sql_cache_size) if sql_cache_size else None
+
+        #=======================================================================
+        # MAX_PREPARED : count of prepared statements (one cursor each) kept by
+        # the connection and reused when the same SQL is executed again, 0
+        # disables it. See StatementPool in pool.py
+        #=======================================================================
+        self.max_prepared = options.get('MAX_PREPARED', 0)
+        self.statement_pool = None
+
+        # IN_CHUNK_SIZE : values of an IN lookup run by each statement, see compiler.py
+        self.in_chunk_size = options.get('IN_CHUNK_SIZE', 1000)
+
+        # PRELOAD_TABLE_METADATA : fill the table metadata cache (operations.py) at connection setup
+        self.preload_table_metadata = options.get('PRELOAD_TABLE_METADATA', False)
+
+        # DATEFORMAT : order of the date parts in the extent values, the -d startup parameter of the session
+        self.date_format = options.get('DATEFORMAT', 'mdy')
+
+    def _cursor(self):
+        settings_dict = self.settings_dict
         dual_str='DUAL'
         
         # Get OpenEdge internal Db Codepage (default iso8859-1) 
         if 'CPINTERNAL' in settings_dict:
             self.oecpinternal = settings_dict['CPINTERNAL']
             
-        if 'TYPECNX' in settings_dict:
-            if 'DSN' in settings_dict['TYPECNX']:
-                #===================================================================
-                # DSN
-                #===================================================================
-                
-                typecnx_str = 'DSN=%s'%settings_dict['TYPECNX']['DSN']
-
-            elif 'DRIVER' in settings_dict['TYPECNX']:
-                #===================================================================
-                # DRIVER
-                #===================================================================
-                typecnx_str = 'DRIVER={%s}'%settings_dict['TYPECNX']['DRIVER']        
-        
-            
         #===================================================================
         # DUAL TABLE
         #===================================================================
@@ -289,59 +417,39 @@ class DatabaseWrapper(BaseDatabaseWrapper):
         else:
             defschema_str = settings_dict['USER']
                 
-                
-        if _DJANGO_VERSION >= 12:
-            options = settings_dict['OPTIONS']
-            if settings_dict['NAME']:
-                db_str = settings_dict['NAME']
-                
-            if settings_dict['HOST']:
-                host_str = settings_dict['HOST']
-            else:
-                host_str = 'localhost'
-            if settings_dict['USER']:
-                user_str = settings_dict['USER']
-                
-                
-            if settings_dict['PASSWORD']:
-                passwd_str = settings_dict['PASSWORD']
-            if settings_dict['PORT']:
-                port_str = settings_dict['PORT']
-            
-            self.introspection.uid = defschema_str
-            self.owner = defschema_str
-        else:
-            options = settings_dict['DATABASE_OPTIONS']
-                            
-            if settings_dict['DATABASE_NAME']:
-                db_str = settings_dict['DATABASE_NAME']
-            if settings_dict['DATABASE_HOST']:
-                host_str = settings_dict['DATABASE_HOST']
-            else:
-                host_str = 'localhost'
-            if settings_dict['DATABASE_USER']:
-                user_str = settings_dict['DATABASE_USER']
-            if settings_dict['DATABASE_PASSWORD']:
-                passwd_str = settings_dict['DATABASE_PASSWORD']
-            if settings_dict['DATABASE_PORT']:
-                port_str = settings_dict['DATABASE_PORT']
+        self.introspection.uid = defschema_str
+        self.owner = defschema_str
         if self.connection is None:
-            new_conn = True
-            if not db_str:
+            if not settings_dict['NAME']:
                 from django.core.exceptions import ImproperlyConfigured
                 raise ImproperlyConfigured('You need to specify NAME in your Django settings file.')
 
-            
-            connstr='%s;HOST=%s;DB=%s;UID=%s;PWD=%s;PORT=%s'%(typecnx_str,host_str,db_str,user_str,passwd_str,port_str)
-            
-            #import pdb; pdb.set_trace()
-            self.connection = Database.connect(connstr)
-            connection_created.send(sender=self.__class__)
+            #===================================================================
+            # The connection string is built by get_new_connection(), opened
+            # by connect() so the connection pool and the autocommit mode are
+            # handled there
+            #===================================================================
+            self.ensure_connection()
 
         #=======================================================================
-        # Set default schema
+        # Set default schema, only once per physical connection
         #=======================================================================
         cursor = self.connection.cursor()
+        if (self.statement_pool is None and self.max_prepared
+                and self.features.can_reuse_prepared_statements):
+            self.statement_pool = StatementPool(self.max_prepared)
+        if self.session_state.is_current(self.connection, defschema_str, dual_str):
+            self.session_state.skipped_round_trips += SessionState.SETUP_ROUND_TRIPS
+        else:
+            self._setup_session(cursor, defschema_str, dual_str)
+        
+        return CursorWrapper(cursor, self.driver_needs_utf8, self.oecpinternal,defschema_str,self.ops,self.creation,self)
+
+    def _setup_session(self, cursor, defschema_str, dual_str):
+        """
+        Select the default schema and make sure the DUAL table exists, then
+        record it in the session state of the wrapper.
+        """
         cursor.execute("SET SCHEMA '%s'"%defschema_str)
         self.connection.commit()
         if len(cursor.execute("SELECT * FROM SYSPROGRESS.SYSTABLEs WHERE OWNER = '%s' AND TBL = '%s'"%(defschema_str,dual_str)).fetchall()) == 0 :        
@@ -349,8 +457,54 @@ class DatabaseWrapper(BaseDatabaseWrapper):
             self.connection.commit()
             cursor.execute('INSERT INTO "%s"."%s" VALUES (1)'%(defschema_str,dual_str))
             self.connection.commit()
-        
-        return CursorWrapper(cursor, self.driver_needs_utf8, self.oecpinternal,defschema_str,self.ops,self.creation)
+        if self.preload_table_metadata and not self.ops.table_metadata.is_preloaded(self.alias, defschema_str):
+            self.ops.preload_table_metadata(cursor, defschema_str)
+        self.session_state.record(self.connection, defschema_str, dual_str)
+
+    def chunked_cursor(self):
+        """
+        Dedicated cursor for a streamed result set (QuerySet.iterator()), kept
+        open until the iterator is exhausted or closed. A regular cursor is
+        returned when the result set can not stay open across commits : in
+        autocommit mode, outside of an atomic block, with a driver closing the
+        cursors on commit.
+        """
+        cursor = self.cursor()
+        if (self.commit_each_statement or self.in_atomic_block or not self.get_autocommit()
+                or self.features.can_use_chunked_reads):
+            cursor.streaming = True
+            self.open_streams += 1
+        return cursor
+
+    def stream_closed(self):
+        """
+        Called when the cursor of a streamed result set is closed, runs the
+        commit deferred by the commit-per-statement mode.
+        """
+        self.open_streams = max(self.open_streams - 1, 0)
+        if not self.open_streams and self.commit_pending:
+            self.commit_pending = False
+            if self.connection is not None:
+                self.connection.commit()
+
+    def _close(self):
+        self.open_streams = 0
+        self.commit_pending = False
+        if self.statement_pool is not None:
+            # The prepared statements belong to this physical connection
+            self.statement_pool.clear()
+        if self.pool is not None and self.connection is not None:
+            if self.in_atomic_block:
+                # close() keeps the connection on the wrapper until the atomic
+                # block exits : it must not be handed to another thread with
+                # its open transaction, it is dropped from the pool.
+                self.session_state.reset()
+                return self.pool.discard(self.connection)
+            # Back to the pool, the session setup stays valid on this connection
+            return self.pool.release(self.connection)
+        # The next physical connection needs its own session setup
+        self.session_state.reset()
+        return super(DatabaseWrapper, self)._close()
 
     ################# 20131007 #############################
     def leave_transaction_management(self):
@@ -399,6 +553,8 @@ class DatabaseWrapper(BaseDatabaseWrapper):
         return self.settings_dict
 
     def get_new_connection(self, conn_params):
+        db_str, user_str, passwd_str, port_str = None, None, "", None
+        dual_str='DUAL'
 
         if 'CPINTERNAL' in conn_params :
             self.oecpinternal = conn_params['CPINTERNAL']
@@ -459,24 +615,124 @@ class DatabaseWrapper(BaseDatabaseWrapper):
             
             connstr='%s;HOST=%s;DB=%s;UID=%s;PWD=%s;PORT=%s'%(typecnx_str,host_str,db_str,user_str,passwd_str,port_str)
             
-            #import pdb; pdb.set_trace()
-            newconnection = Database.connect(connstr)
+            #===================================================================
+            # Pooled connection, see pool.py
+            #===================================================================
+            if options.get('POOL'):
+                self.pool = get_pool(Database.connect, connstr, options['POOL'],
+                                     'SELECT SEQACCESS FROM "%s"."%s"'%(defschema_str,dual_str))
+                newconnection = self.pool.acquire()
+            else:
+                #import pdb; pdb.set_trace()
+                newconnection = Database.connect(connstr)
             connection_created.send(sender=self.__class__)
             return newconnection
 
     def _set_autocommit(self, autocommit):
-        self.autocommit = True
+        if self.commit_each_statement:
+            # The CursorWrapper commits each statement, pyodbc stays in manual
+            # mode. Django still tracks its own autocommit flag, set by
+            # set_autocommit() after this hook.
+            return
+        with self.wrap_database_errors:
+            self.connection.autocommit = autocommit
 
     def init_connection_state(self):
+        """
+        Read once per connection what the driver does with the open cursors on
+        commit and rollback, see DatabaseFeatures.can_use_chunked_reads.
+        """
+        try:
+            self.cursor_commit_behavior = self.connection.getinfo(Database.SQL_CURSOR_COMMIT_BEHAVIOR)
+            self.cursor_rollback_behavior = self.connection.getinfo(Database.SQL_CURSOR_ROLLBACK_BEHAVIOR)
+        except (AttributeError, Database.Error):
+            self.cursor_commit_behavior = self.cursor_rollback_behavior = None
         return True
 
+#===============================================================================
+# Statement classification
+#
+# Each distinct SQL string is classified once: the '%s' placeholders are
+# replaced by the pyodbc '?' ones, the trailing ';' is removed (not supported
+# by OpenEdge) and the statement kind is recorded. Only the CREATE TABLE and
+# ALTER TABLE statements need the OpenEdge rewriting done in
+# CursorWrapper.format_ddl(), the DML goes straight to pyodbc. The other DDL
+# statements are only recorded, they invalidate the table metadata cache.
+#===============================================================================
+STMT_DML = 'DML'
+STMT_DDL = 'DDL'
+STMT_CREATE_TABLE = 'CREATE TABLE'
+STMT_ALTER_TABLE = 'ALTER TABLE'
+DDL_KEYWORDS = ('CREATE', 'ALTER', 'DROP', 'RENAME', 'TRUNCATE')
+STATEMENT_CACHE_SIZE = 1024
+
+@lru_cache(maxsize=STATEMENT_CACHE_SIZE)
+def classify_statement(sql, n_params=None):
+    """
+    Returns (kind, sql, placeholder count) for a raw SQL statement, kind is
+    one of STMT_DML, STMT_DDL, STMT_CREATE_TABLE or STMT_ALTER_TABLE.
+    Cache statistics are available with classify_statement.cache_info().
+    """
+    if n_params is not None:
+        sql = sql % tuple('?' * n_params)
+    else:
+        if '%s' in sql:
+            sql = sql.replace('%s', '?')
+        n_params = sql.count('?')
+
+    #=======================================================================
+    # OpenEdge no ; at the end
+    #=======================================================================
+    if sql.endswith(';'):
+        sql = sql[:-1]
+
+    kind = STMT_DML
+    if 'CREATE TABLE ' in sql or 'ALTER TABLE ' in sql:
+        sql = sql.replace('\n', '')
+        if 'CREATE TABLE ' in sql:
+            kind = STMT_CREATE_TABLE
+        else:
+            kind = STMT_ALTER_TABLE
+    elif sql.lstrip()[:8].upper().startswith(DDL_KEYWORDS):
+        kind = STMT_DDL
+    return kind, sql, n_params
+
+
+# SQLSTATEs of a driver without parameter array binding (fast_executemany)
+ARRAY_BINDING_UNSUPPORTED = ('HYC00', 'HY092', 'IM001')
+
+@lru_cache(maxsize=None)
+def result_transcoder(oecpinternal):
+    """
+    Returns the function transcoding the character values read from the
+    database to unicode, or None when the codepage needs no transcoding.
+    The driver gives the bytes of the OpenEdge codepage as latin-1 characters,
+    values already decoded by the driver are kept as is.
+    """
+    codec = codecs.lookup(oecpinternal)
+    if codec.name in ('iso8859-1', 'ascii'):
+        return None
+    decode = codec.decode
+
+    def transcode(value):
+        try:
+            return decode(value.encode('iso8859-1'))[0]
+        except UnicodeError:
+            return value
+    return transcode
+
+
 class CursorWrapper(object):
     """
     A wrapper around the pyodbc's cursor that takes in account a) some pyodbc
     DB-API 2.0 implementation and b) some common ODBC driver particularities.
     """
-    def __init__(self, cursor, driver_needs_utf8,oecpinternal,defschema_str,ops,creation):
+    def __init__(self, cursor, driver_needs_utf8,oecpinternal,defschema_str,ops,creation,db):
         self.cursor = cursor
+        self.db = db
+        # Own cursor, self.cursor is a pooled one while it runs a statement
+        self.own_cursor = cursor
+        self.statement = None
         self.driver_needs_utf8 = driver_needs_utf8
         self.oecpinternal = oecpinternal
         self.last_sql = ''
@@ -490,6 +746,22 @@ class CursorWrapper(object):
         
         self.creation = creation
         self.ops = ops
+        # True for the dedicated cursor of a streamed result set
+        self.streaming = False
+
+        # Parameter types of the next executemany(), see setinputsizes()
+        self.input_sizes = None
+
+        # Character values transcoding, see result_transcoder()
+        self._decode_positions = None
+        if db.unicode_results:
+            self.transcode = None
+        else:
+            self.transcode = result_transcoder(oecpinternal)
+
+        self.param_converters = {bool: self._convert_bool}
+        if self.driver_needs_utf8:
+            self.param_converters[str] = self._convert_str
 
     def format_sql(self, sql, n_params=None):
         
@@ -497,114 +769,161 @@ class CursorWrapper(object):
         ## 20190313 portage python 3.7     sql = sql.encode('utf-8')
         
         # pyodbc uses '?' instead of '%s' as parameter placeholder.
-        if n_params is not None:
-            sql = sql % tuple('?' * n_params)
-        else:
-            if '%s' in sql:
-                sql = sql.replace('%s', '?')
-            
-        return sql
+        return classify_statement(sql, n_params)[1]
+
+    #===========================================================================
+    # Parameters adaptation
+    #
+    # The converters are chosen by the type of the value: bool is sent as an
+    # integer (OpenEdge has no bit type) and str values are checked against
+    # the OpenEdge codepage (CPINTERNAL) when the driver needs it, the other
+    # types are given as is to pyodbc.
+    # For executemany(), a converter plan is built once per column position
+    # from the first row, and applied to every row.
+    #===========================================================================
+    def _convert_bool(self, p):
+        if p is True:
+            return 1
+        if p is False:
+            return 0
+        return self.adapt_param(p)
+
+    def _convert_str(self, p):
+        if p.__class__ is not str:
+            return self.adapt_param(p)
+        try:
+            ## pyodbc sends unicode, the driver transcodes it to CPINTERNAL
+            p.encode(self.oecpinternal)
+        except UnicodeEncodeError as e:
+            raise Database.DataError("Value %r can not be converted to the OpenEdge codepage %s : %s" % (p, self.oecpinternal, e))
+        return p
+
+    def adapt_param(self, p):
+        converter = self.param_converters.get(p.__class__)
+        if converter is None:
+            return p
+        return converter(p)
+
+    def param_plan(self, row):
+        """
+        Returns the (position, converter) pairs needed for the rows of
+        parameters of the same types than row. A None value gives a generic
+        converter since the type of the column is unknown.
+        """
+        converters = self.param_converters
+        plan = []
+        for i, p in enumerate(row):
+            converter = converters.get(p.__class__)
+            if converter is None and p is None:
+                converter = self.adapt_param
+            if converter is not None:
+                plan.append((i, converter))
+        return plan
 
     def format_params(self, params):
+        adapt = self.adapt_param
+        return tuple([adapt(p) for p in params])
+
+    def format_params_list(self, params_list):
+        """
+        Adapt the parameters of executemany(), the rows which need no
+        conversion are kept as is.
+        """
+        if not params_list:
+            return params_list
+        plan = self.param_plan(params_list[0])
+        if not plan:
+            return params_list
+
+        formatted = []
+        append = formatted.append
+        for row in params_list:
+            new_row = None
+            for i, converter in plan:
+                value = row[i]
+                converted = converter(value)
+                if converted is not value:
+                    if new_row is None:
+                        new_row = list(row)
+                    new_row[i] = converted
+            append(row if new_row is None else new_row)
+        return formatted
+
+    def format_ddl(self, kind, sql):
+        """
+        OpenEdge rewriting of CREATE TABLE and ALTER TABLE statements: the
+        table name is truncated to MAX_TABLE_NAME and the UNIQUE clause of a
+        CREATE TABLE is extracted as a CREATE UNIQUE INDEX statement.
+        Returns the statement and the unique index statement (or None).
+        """
+        sqlUniqueIndex=None
+        Statement='%s "'%kind
+            
+        motif='%s(?P<TName>\w+)"'%Statement    
+        tn=re.search(motif, sql)
+        if tn is not None:
+            OETblName=tn.group('TName')[:self.MAX_TABLE_NAME]                
         
-        #import pdb; pdb.set_trace()
-        
-        fp = []
-        
-        for p in params:
-            if isinstance(p, str):
-                if self.driver_needs_utf8:                    
-                    ## fp.append(p.encode('utf-8'))
-                    ## 20200113 Portage Django 2 python 3
-                    fp.append(p.encode('utf-8').decode('ascii'))
-                else:
-                    fp.append(p)
-            elif isinstance(p, str):
-                if self.driver_needs_utf8:
-                    # fp.append(p.decode(self.oecpinternal).encode('utf-8'))
-                    ## 20200113 Portage Django 2 python 3
-                    fp.append(p.decode(self.oecpinternal).encode('utf-8').decode('ascii'))
-                else:
-                    fp.append(p)
-            elif isinstance(p, type(True)):
-                if p:
-                    fp.append(1)
-                else:
-                    fp.append(0)
-            else:
-                fp.append(p)
-        return tuple(fp)
+        motif='%s\w+"'%Statement
+        sql=re.sub(motif,'', sql)
+        if kind == STMT_CREATE_TABLE:
+            uniqueKw=re.search('(?P<uniqueClause>UNIQUE *\(.*\))', sql)
+            if uniqueKw is not None:
+                
+                fidx=re.search('("\w+"[, ]*)+',uniqueKw.group('uniqueClause'))                    
+                FieldIdx=fidx.group().split(',')
+                indexName=self.ops.create_index_name(OETblName, FieldIdx, self.creation,self.MAX_INDEX_NAME,suffix="")                    
+                cols = ", ".join(FieldIdx)                    
+                sql=re.sub('(?P<uniqueClause>, *UNIQUE *\(".*"\))','', sql)
+                sqlUniqueIndex='CREATE UNIQUE INDEX %s ON "%s" (%s)'%(indexName,OETblName,cols)
+                
+                #=====================Old method ======================================
+                # fidx=re.search('("\w+"[, ]*)+',uniqueKw.group('uniqueClause'))
+                # if fidx is not None:
+                #     idxnum=1
+                #     FieldIdx=fidx.group().split(',')
+                #     sqlUniqueIndex='CREATE UNIQUE INDEX %s_%s ON "%s" ('%(OETblName[:self.MAX_INDEX_NAME],str(idxnum),OETblName)
+                #      
+                #     for fieldName in FieldIdx:
+                #         sqlUniqueIndex+='%s ,'%fieldName
+                #      
+                #     sqlUniqueIndex='%s)'%sqlUniqueIndex[:-1]
+                #===========================================================
+            
+            #idSequence='CREATE SEQUENCE PUB.ID_%s START WITH 0, INCREMENT BY 1, MINVALUE 0, NOCYCLE'%OETblName[:self.MAX_SEQNAME]
+            
+        sql='%s%s" %s'%(Statement,OETblName,sql)                
+        return sql, sqlUniqueIndex
 
     def execute(self, sql, params=()):
         #import pdb; pdb.set_trace()        
         self.last_sql = sql        
-        sql = self.format_sql(sql, len(params))
+        #=======================================================================
+        # Placeholders, trailing ';' and statement kind come from the cache,
+        # only CREATE/ALTER TABLE statements need the OpenEdge rewriting
+        #=======================================================================
+        kind, sql, n_placeholders = classify_statement(sql, len(params))
+        self._decode_positions = None
         params = self.format_params(params)
         self.last_params = params
         
         ## print ('>>> -params - Execute ',sql,params)
 
-        #=======================================================================
-        # OpenEdge no ; at the end
-        #=======================================================================
-        if sql.endswith(';') is True:
-            sql=sql[:-1]
-        
-        
         sqlUniqueIndex=None
-        idSequence=None
-        sql=sql.replace('\n','')
-        
-        if re.search('CREATE TABLE ',sql) is not None or re.search('ALTER TABLE ',sql) is not None:
-            
-            if re.search('CREATE TABLE ',sql) is not None :
-                Statement='CREATE TABLE "'
-            elif re.search('ALTER TABLE ',sql) is not None :
-                Statement='ALTER TABLE "'
-            
-            motif='%s(?P<TName>\w+)"'%Statement    
-            tn=re.search(motif, sql)
-            if tn is not None:
-                OETblName=tn.group('TName')[:self.MAX_TABLE_NAME]                
-            
-            motif='%s\w+"'%Statement
-            sql=re.sub(motif,'', sql)
-            if Statement == 'CREATE TABLE "':
-                uniqueKw=re.search('(?P<uniqueClause>UNIQUE *\(.*\))', sql)
-                if uniqueKw is not None:
-                    
-                    fidx=re.search('("\w+"[, ]*)+',uniqueKw.group('uniqueClause'))                    
-                    FieldIdx=fidx.group().split(',')
-                    indexName=self.ops.create_index_name(OETblName, FieldIdx, self.creation,self.MAX_INDEX_NAME,suffix="")                    
-                    cols = ", ".join(FieldIdx)                    
-                    sql=re.sub('(?P<uniqueClause>, *UNIQUE *\(".*"\))','', sql)
-                    sqlUniqueIndex='CREATE UNIQUE INDEX %s ON "%s" (%s)'%(indexName,OETblName,cols)
-                    
-                    #=====================Old method ======================================
-                    # fidx=re.search('("\w+"[, ]*)+',uniqueKw.group('uniqueClause'))
-                    # if fidx is not None:
-                    #     idxnum=1
-                    #     FieldIdx=fidx.group().split(',')
-                    #     sqlUniqueIndex='CREATE UNIQUE INDEX %s_%s ON "%s" ('%(OETblName[:self.MAX_INDEX_NAME],str(idxnum),OETblName)
-                    #      
-                    #     for fieldName in FieldIdx:
-                    #         sqlUniqueIndex+='%s ,'%fieldName
-                    #      
-                    #     sqlUniqueIndex='%s)'%sqlUniqueIndex[:-1]
-                    #===========================================================
-                
-                #idSequence='CREATE SEQUENCE PUB.ID_%s START WITH 0, INCREMENT BY 1, MINVALUE 0, NOCYCLE'%OETblName[:self.MAX_SEQNAME]
-                
-            
-                
-            sql='%s%s" %s'%(Statement,OETblName,sql)                
-        
+        if kind is not STMT_DML:
+            ## Schema change, the cached has_id_col() answers, sequence blocks and SQL may be stale
+            self.ops.table_metadata.clear(self.db.alias)
+            self.ops.sequence_allocator.clear(alias=self.db.alias)
+            if self.db.sql_cache is not None:
+                self.db.sql_cache.clear()
+            if kind is not STMT_DDL:
+                sql, sqlUniqueIndex = self.format_ddl(kind, sql)
                 
         #import pdb; pdb.set_trace()
 
+        cursor = self.statement_cursor(kind, sql)
         try:            
-            rcode=self.cursor.execute(sql,params)            
-            self.connection.commit()
+            rcode=cursor.execute(sql,params)            
         except  Exception as e:            
             #print 'OpenEdge Base %s  ::: values : %s ::: Sequence : %s ::: Unique Index : %s ' % (sql,params,idSequence,sqlUniqueIndex)
             print('OpenEdge base.py.execute()  Base %s  ::: values : %s :::  Unique Index : %s ' % (sql,params,sqlUniqueIndex))
@@ -613,9 +932,51 @@ class CursorWrapper(object):
         
         if sqlUniqueIndex is not None:
             self.cursor.execute(sqlUniqueIndex)
-        self.connection.commit()        
+        #=======================================================================
+        # Commit-per-statement compatibility mode, otherwise the commits are
+        # done by pyodbc autocommit or at the end of the Django transaction
+        #=======================================================================
+        if self.db.commit_each_statement:
+            self.commit_statement()
         return rcode
 
+    def statement_cursor(self, kind, sql):
+        """
+        Returns the pyodbc cursor to run sql. With a statement pool, a DML
+        statement runs on the pooled cursor which already prepared it, or on a
+        new cursor which is pooled once the statement is done.
+        """
+        self.release_statement()
+        pool = self.db.statement_pool
+        if pool is None or kind is not STMT_DML or self.streaming:
+            return self.cursor
+        cursor = pool.checkout(sql)
+        if cursor is None:
+            cursor = self.db.connection.cursor()
+        self.statement = (sql, cursor, pool, pool.generation)
+        self.cursor = cursor
+        return cursor
+
+    def release_statement(self):
+        """
+        Gives the pooled cursor of the last statement back to the pool.
+        """
+        if self.statement is not None:
+            sql, cursor, pool, generation = self.statement
+            self.statement = None
+            self.cursor = self.own_cursor
+            pool.checkin(sql, cursor, generation)
+
+    def commit_statement(self):
+        """
+        Commit-per-statement compatibility mode. The commit is deferred while
+        a streamed result set is open, it would invalidate its cursor.
+        """
+        if self.streaming or self.db.open_streams:
+            self.db.commit_pending = True
+        else:
+            self.connection.commit()
+
     #def check_sql_string(self, sql, values):
     #    unique = "%PARAMETER%"
     #    sql = sql.replace("?", unique)
@@ -623,45 +984,113 @@ class CursorWrapper(object):
     #    for v in values: sql = sql.replace(unique, repr(v), 1)
     #    return sql
     
+    def setinputsizes(self, sizes):
+        """
+        Parameter types (pyodbc setinputsizes() format) of the next
+        executemany(), only used with the parameter array binding.
+        """
+        self.input_sizes = sizes
+
     def executemany(self, sql, params_list):        
+        self.release_statement()
         sql = self.format_sql(sql)
+        self._decode_positions = None
+        input_sizes, self.input_sizes = self.input_sizes, None
         # pyodbc's cursor.executemany() doesn't support an empty param_list
         if not params_list:
             if '?' in sql:
                 return
+            chunks = [params_list]
         else:
-            raw_pll = params_list
-            params_list = [self.format_params(p) for p in raw_pll]
+            #===================================================================
+            # Large batches are formatted and sent by chunks of BULK_CHUNK_SIZE
+            # rows, the memory used stays bounded
+            #===================================================================
+            chunk_size = self.db.bulk_chunk_size or len(params_list)
+            chunks = (params_list[i:i + chunk_size] for i in range(0, len(params_list), chunk_size))
                        
         ## 20200122 With Django 3 this function is called but commy was missing
 
-        try:      
-            rcode=self.cursor.executemany(sql, params_list)
-            self.connection.commit()
-            return rcode
-        except  Exception as e:            
-            print('OpenEdge base.py.executemany() Base %s  ::: values : %s :::  Unique Index : %s ' % (sql,params_list))
-            raise Database.DatabaseError(e)
+        rcode = None
+        for chunk in chunks:
+            if chunk:
+                chunk = self.format_params_list(chunk)
+            try:
+                if not (chunk and self.db.fast_executemany and self._array_executemany(sql, chunk, input_sizes)):
+                    rcode=self.cursor.executemany(sql, chunk)
+            except  Exception as e:            
+                print('OpenEdge base.py.executemany() Base %s  ::: values : %s ' % (sql,chunk))
+                raise Database.DatabaseError(e)
+        if self.db.commit_each_statement:
+            self.commit_statement()
+        return rcode
+
+    def _array_executemany(self, sql, params_list, input_sizes):
+        """
+        executemany() with the pyodbc parameter array binding (one round trip
+        for the whole chunk). Returns False, and disables it for the
+        connection, when the driver does not support it.
+        """
+        try:
+            self.cursor.fast_executemany = True
+        except AttributeError:
+            # pyodbc older than 4.0.19
+            self.db.fast_executemany = False
+            return False
+        try:
+            if input_sizes:
+                self.cursor.setinputsizes(input_sizes)
+            self.cursor.executemany(sql, params_list)
+        except Database.Error as e:
+            if e.args and e.args[0] in ARRAY_BINDING_UNSUPPORTED:
+                self.db.fast_executemany = False
+                return False
+            raise
+        finally:
+            self.cursor.fast_executemany = False
+            if input_sizes:
+                self.cursor.setinputsizes(None)
+        return True
+
+    def _decoding_plan(self):
+        """
+        Positions of the character columns of the current result set, taken
+        once per result set from cursor.description. Empty when the values
+        need no transcoding.
+        """
+        if self._decode_positions is None:
+            if not self.driver_needs_utf8 or self.transcode is None:
+                positions = ()
+            else:
+                description = self.cursor.description or ()
+                positions = tuple([i for i, d in enumerate(description) if d[1] is str])
+            self._decode_positions = positions
+        return self._decode_positions
 
-    def format_results(self, rows):
+    def format_rows(self, rows):
         """
         Decode data coming from the database if needed and convert rows to tuples
-        (pyodbc Rows are not sliceable).
+        (pyodbc Rows are not sliceable). Only the character columns are
+        transcoded.
         """
-        #import pdb; pdb.set_trace()
-        
-        if not self.driver_needs_utf8:
-            return tuple(rows)
-        
-        fr = []
+        positions = self._decoding_plan()
+        if not positions:
+            return [tuple(row) for row in rows]
+
+        transcode = self.transcode
+        formatted = []
+        append = formatted.append
         for row in rows:
-            if isinstance(row, str):
-                ##fr.append(row.decode(self.oecpinternal).encode('utf-8').decode('utf-8'))                
-                ## 20200113 Adaptation Python 3 - Django 2
-                fr.append(row.encode('ascii').decode(self.oecpinternal).encode('utf-8').decode('utf-8'))
-            else:
-                fr.append(row)
-        return tuple(fr)
+            row = list(row)
+            for i in positions:
+                value = row[i]
+                if value is not None:
+                    row[i] = transcode(value)
+            append(tuple(row))
+        return formatted
+
+    def format_results(self, row):
+        return self.format_rows((row,))[0]
 
     def fetchone(self):
         row = self.cursor.fetchone()
@@ -670,10 +1099,24 @@ class CursorWrapper(object):
         return []
 
     def fetchmany(self, chunk):
-        return [self.format_results(row) for row in self.cursor.fetchmany(chunk)]
+        return self.format_rows(self.cursor.fetchmany(chunk))
 
     def fetchall(self):
-        return [self.format_results(row) for row in self.cursor.fetchall()]
+        return self.format_rows(self.cursor.fetchall())
+
+    def close(self):
+        if self.streaming:
+            self.streaming = False
+            self.db.stream_closed()
+        self.release_statement()
+        self.cursor.close()
+
+    def __del__(self):
+        # A wrapper dropped without close() still gives its pooled cursor back
+        try:
+            self.release_statement()
+        except Exception:
+            pass
 
     def __getattr__(self, attr):
         if attr in self.__dict__:
@@ -694,4 +1137,4 @@ class CursorWrapper(object):
 
     def __exit__(self, exc_type, exc_val, exc_tb):
         # make sure the dbconnection gets closed
-        self.cursor.close()            
\ No newline at end of file
+        self.close()            
\ No newline at end of file
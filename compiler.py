@@ -18,7 +18,12 @@ except ImportError:
 
 
 from django.db.utils import DatabaseError
+from django.db.models.expressions import Col
+from django.db.models.lookups import BuiltinLookup, IsNull
+from django.db.models.sql.where import AND, OR, WhereNode
 from datetime import datetime
+import heapq
+import itertools
 import re
 from django.db.models.sql.datastructures import EmptyResultSet
 # 20190313 portage python3 from django.utils.encoding import smart_str, smart_unicode
@@ -29,7 +34,354 @@ from django.db.models.sql.constants import (
 )
 
 
+#===============================================================================
+# Lock and index hints
+#
+# NOLOCK (dirty read) and READPAST (skip the locked rows) are statement hints,
+# OpenEdge only accepts them at the end of the SELECT statement. INDEX is a
+# table hint, rendered after the table reference in the FROM clause.
+# The hints are taken in this order, each level overriding the previous one :
+#   - the OPTIONS of the database : 'NOLOCK' (default True), 'READPAST'
+#   - the OEhints attribute of the model : OEhints = {'nolock': False, 'index': 'CustNum'}
+#   - the queryset : OpenEdgeQuerySet.with_hints(), see OEmodels/OpenEdgeQuerySet.py
+# The index hint is an index name for the table of the model, or a dict
+# {db_table: index name} for the joined tables.
+#===============================================================================
+
+def merge_hints(hints, level):
+    """
+    Updates hints with the ones of a level, NOLOCK and READPAST exclude each other.
+    """
+    if level.get('nolock'):
+        hints['readpast'] = False
+    if level.get('readpast'):
+        hints['nolock'] = False
+    hints.update(level)
+    return hints
+
+
+def freeze_key(value):
+    """
+    Hashable form of the dict (select_related, hints) used in the SQL cache keys.
+    """
+    if isinstance(value, dict):
+        return tuple(sorted((k, freeze_key(v)) for k, v in value.items()))
+    return value
+
+
+#===============================================================================
+# Chunked IN lookups (OPTIONS 'IN_CHUNK_SIZE', default 1000, 0 disables it)
+#
+# A top level IN lookup with more values than IN_CHUNK_SIZE is run as several
+# statements of IN_CHUNK_SIZE values each : OpenEdge limits the statement
+# length and the parameter count, and the long IN lists optimize badly.
+# The reads are merged on the ordering when it is made of selected numeric or
+# date columns (NULL sorted last, as OpenEdge does), which compare the same in
+# Python. The queries ordered on another column (character columns follow the
+# collation of the database, not the Python comparison), on a column which is
+# not selected (a related field, an expression), sliced, DISTINCT or with an
+# aggregation are not split.
+# The UPDATE and DELETE statements are split too, their row counts are summed.
+#===============================================================================
+
+# Internal types of the ordering columns which compare the same in Python
+MERGEABLE_TYPES = frozenset((
+    'AutoField', 'BigAutoField', 'BigIntegerField', 'IntegerField', 'SmallIntegerField',
+    'PositiveIntegerField', 'PositiveSmallIntegerField', 'DecimalField', 'FloatField',
+    'DateField', 'DateTimeField', 'TimeField', 'BooleanField', 'NullBooleanField',
+))
+
+
+# Lookups an OpenEdge index can serve, for the OR to UNION rewrite
+INDEXABLE_LOOKUPS = frozenset((
+    'exact', 'iexact', 'in', 'gt', 'gte', 'lt', 'lte', 'range', 'startswith', 'istartswith', 'isnull',
+))
+
+
+class Descending(object):
+    """
+    Sort key reversing the comparison, for the DESC columns of a merge.
+    """
+    __slots__ = ('key',)
+
+    def __init__(self, key):
+        self.key = key
+
+    def __lt__(self, other):
+        return other.key < self.key
+
+    def __eq__(self, other):
+        return self.key == other.key
+
+
+def merge_key(positions):
+    """
+    Returns the sort key of the rows for the ordering [(position, descending)].
+    """
+    def key(row):
+        values = []
+        for position, descending in positions:
+            value = row[position]
+            value = (value is None, value if value is not None else 0)
+            values.append(Descending(value) if descending else value)
+        return values
+    return key
+
+
+class NotMatched(object):
+    """
+    WHERE clause node excluding the rows matched by one of nodes, for the
+    UNION ALL branches of the OR to UNION rewrite. A node evaluated to NULL
+    (unknown) does not match, as in the OR form :
+        CASE WHEN (a) OR (b) THEN 1 ELSE 0 END = 0
+    """
+    contains_aggregate = False
+    contains_over_clause = False
+
+    def __init__(self, nodes):
+        self.nodes = nodes
+
+    def as_sql(self, compiler, connection):
+        sqls, params = [], []
+        for node in self.nodes:
+            try:
+                sql, node_params = compiler.compile(node)
+            except EmptyResultSet:
+                # Matches no row, excludes nothing
+                continue
+            if not sql:
+                # Matches every row
+                raise EmptyResultSet
+            sqls.append('(%s)' % sql)
+            params.extend(node_params)
+        if not sqls:
+            return '', []
+        return 'CASE WHEN %s THEN 1 ELSE 0 END = 0' % ' OR '.join(sqls), params
+
+    def relabeled_clone(self, change_map):
+        return NotMatched([node.relabeled_clone(change_map) for node in self.nodes])
+
+
+class IndexHint(object):
+    """
+    Table reference of the FROM clause (BaseTable or Join) followed by its
+    INDEX hint, before the ON clause of a join.
+    """
+    def __init__(self, table, index):
+        self.table = table
+        self.index = index
+
+    def as_sql(self, compiler, connection):
+        table = self.table
+        sql, params = compiler.compile(table)
+        hint = ' WITH (INDEX (%s))' % connection.ops.quote_name(self.index)
+        if table.join_type is None:
+            return sql + hint, params
+        # The table reference rendered by Join.as_sql(), the ON clause follows it
+        alias_str = '' if table.table_alias == table.table_name else (' %s' % table.table_alias)
+        reference = '%s %s%s' % (table.join_type, compiler.quote_name_unless_alias(table.table_name), alias_str)
+        if not sql.startswith(reference + ' ON ('):
+            raise DatabaseError("Cannot place the INDEX hint of %s in %r" % (table.table_name, sql))
+        return reference + hint + sql[len(reference):], params
+
+
+class RowCount(object):
+    """
+    Result of a chunked UPDATE / DELETE, in place of the cursor.
+    """
+    def __init__(self, rowcount):
+        self.rowcount = rowcount
+
+    def close(self):
+        pass
+
+
 class SQLCompiler(compiler.SQLCompiler):
+    # The statement hints (NOLOCK, READPAST) only apply to the reads
+    statement_hints = True
+
+    def get_in_chunks(self, result_type):
+        """
+        Returns (child position, lookup, value chunks, merge positions) when
+        the query has an oversized IN lookup to split, otherwise None.
+        """
+        size = self.connection.in_chunk_size
+        query = self.query
+        where = query.where
+        if not size or where.connector != AND or where.negated:
+            return None
+        for position, child in enumerate(where.children):
+            rhs = getattr(child, 'rhs', None)
+            if (getattr(child, 'lookup_name', None) == 'in' and isinstance(rhs, (list, tuple, set, frozenset))
+                    and len(rhs) > size and not hasattr(child.lhs, 'sources')):
+                break
+        else:
+            return None
+        values = list(rhs)
+        chunks = [values[i:i + size] for i in range(0, len(values), size)]
+
+        if not self.statement_hints:
+            # UPDATE / DELETE of a single table, the row counts are summed
+            if result_type != CURSOR or getattr(query, 'related_updates', None):
+                return None
+            if len([a for a in query.alias_map if query.alias_refcount[a]]) > 1:
+                return None
+            return position, child, chunks, None
+
+        if (result_type not in (MULTI, SINGLE) or query.low_mark or query.high_mark is not None
+                or query.distinct or query.group_by is not None or query.combinator
+                or any(getattr(a, 'contains_aggregate', False) for a in query.annotations.values())):
+            return None
+
+        # The ordering has to be rebuilt by the merge
+        probe = query.clone().get_compiler(connection=self.connection)
+        probe.setup_query()
+        positions = []
+        for expr, _ in probe.get_order_by():
+            column = getattr(expr, 'expression', None)
+            index = None
+            for i, (selected, _, _) in enumerate(probe.select):
+                if selected == column:
+                    index = i
+                    break
+            field = getattr(column, 'target', None)
+            if index is None or field is None:
+                return None
+            if field.is_relation:
+                field = field.target_field
+            if field.get_internal_type() not in MERGEABLE_TYPES:
+                return None
+            positions.append((index, expr.descending))
+        if positions and result_type == SINGLE:
+            return None
+        return position, child, chunks, positions
+
+    def chunk_compiler(self, position, lookup, values):
+        """
+        Returns the compiler of a copy of the query, with values in the IN lookup.
+        """
+        query = self.query.clone()
+        query.where.children[position] = type(lookup)(lookup.lhs, values)
+        return query.get_compiler(connection=self.connection)
+
+    def execute_in_chunks(self, in_chunks, result_type, chunked_fetch, chunk_size):
+        """
+        execute_sql() of a query split by get_in_chunks().
+        """
+        position, lookup, chunks, positions = in_chunks
+        compilers = (self.chunk_compiler(position, lookup, values) for values in chunks)
+
+        if not self.statement_hints:
+            rowcount = 0
+            for chunk in compilers:
+                cursor = SQLCompiler.execute_sql(chunk, CURSOR)
+                if cursor:
+                    rowcount += cursor.rowcount
+                    cursor.close()
+            return RowCount(rowcount)
+
+        if result_type == SINGLE:
+            for chunk in compilers:
+                row = chunk.execute_sql(SINGLE)
+                self.copy_compiled_state(chunk)
+                if row:
+                    return row
+            return None
+
+        first = next(compilers)
+        if positions:
+            # All the chunks are read, then merged on the ordering columns
+            results = [first.execute_sql(MULTI)]
+            self.copy_compiled_state(first)
+            results.extend(chunk.execute_sql(MULTI) for chunk in compilers)
+            rows = heapq.merge(*[itertools.chain.from_iterable(r) for r in results], key=merge_key(positions))
+            size = self.connection.fetch_size
+            return list(iter(lambda: list(itertools.islice(rows, size)), []))
+
+        blocks = first.execute_sql(MULTI, chunked_fetch, chunk_size)
+        self.copy_compiled_state(first)
+        if not chunked_fetch:
+            return list(itertools.chain(blocks, *[c.execute_sql(MULTI) for c in compilers]))
+        # Streamed, one chunk is read at a time
+        return itertools.chain(blocks, itertools.chain.from_iterable(
+            c.execute_sql(MULTI, chunked_fetch, chunk_size) for c in compilers))
+
+    def copy_compiled_state(self, compiler):
+        """
+        The model iterables read the select list of this compiler, which did not compile the query.
+        """
+        self.select = compiler.select
+        self.klass_info = compiler.klass_info
+        self.annotation_col_map = compiler.annotation_col_map
+        self.col_count = compiler.col_count
+        self.has_extra_select = getattr(compiler, 'has_extra_select', False)
+
+    def get_hints(self):
+        """
+        Returns the hints of the query : nolock, readpast and index.
+        """
+        options = self.connection.settings_dict.get('OPTIONS', {})
+        hints = {'nolock': options.get('NOLOCK', True), 'readpast': options.get('READPAST', False), 'index': None}
+        if self.query.model is not None:
+            merge_hints(hints, getattr(self.query.model, 'OEhints', {}))
+        return merge_hints(hints, getattr(self.query, 'oe_hints', {}))
+
+    def statement_hint_sql(self):
+        """
+        Returns the NOLOCK / READPAST clause ending the SELECT statement.
+        """
+        if not self.statement_hints or self.query.select_for_update:
+            return ''
+        hints = self.get_hints()
+        if hints['readpast']:
+            if hints['readpast'] is True:
+                return ' WITH (READPAST NOWAIT)'
+            return ' WITH (READPAST WAIT %d)' % hints['readpast']
+        if hints['nolock']:
+            return ' WITH (NOLOCK)'
+        return ''
+
+    def index_hint(self, table_name):
+        """
+        Returns the index hint of a table of the query, or None.
+        """
+        index = self.get_hints()['index']
+        if isinstance(index, dict):
+            return index.get(table_name)
+        if index and self.query.model is not None and table_name == self.query.model._meta.db_table:
+            return index
+        return None
+
+    def get_from_clause(self):
+        """
+        Same as the Django one, with the INDEX hints after the table references.
+        """
+        result = []
+        params = []
+        for alias in tuple(self.query.alias_map):
+            if not self.query.alias_refcount[alias]:
+                continue
+            try:
+                from_clause = self.query.alias_map[alias]
+            except KeyError:
+                # Extra tables can end up in self.tables, but not in the
+                # alias_map if they aren't in a join. That's OK. We skip them.
+                continue
+            index = self.index_hint(getattr(from_clause, 'table_name', None))
+            if index:
+                from_clause = IndexHint(from_clause, index)
+            clause_sql, clause_params = self.compile(from_clause)
+            result.append(clause_sql)
+            params.extend(clause_params)
+        for t in self.query.extra_tables:
+            alias, _ = self.query.table_alias(t)
+            # Only add the alias if it's not already present (the table_alias()
+            # call increments the refcount, so an alias refcount of one means
+            # this is the only reference).
+            if alias not in self.query.alias_map or self.query.alias_refcount[alias] == 1:
+                result.append(', %s' % self.quote_name_unless_alias(alias))
+        return result, params
+
     def formatTableName(self,data):
         #import pdb; pdb.set_trace()
         if isinstance(data,list) is True:
@@ -61,7 +413,219 @@ class SQLCompiler(compiler.SQLCompiler):
                     
             return '"'.join(tdata)
     
-    def as_sql(self, with_limits=False, with_col_aliases=False, subquery=False):
+    #===========================================================================
+    # Compiled SQL cache (OPTIONS 'SQL_CACHE_SIZE')
+    #
+    # The simple SELECT queries (no annotation, extra, grouping, distinct
+    # fields, combinator or FOR UPDATE) are keyed by their shape : model,
+    # joins, WHERE clause fingerprint, ordering, selected fields, limits and
+    # hints. The WHERE clause is not compiled : its fingerprint is the tree of
+    # the connectors, lookup classes, target columns and placeholders of the
+    # values, its parameters are the ones of the cached SQL. Only the trees of
+    # built-in lookups on a column with plain values are cached. The same SQL
+    # string also lets pyodbc reuse the prepared statement.
+    #===========================================================================
+    def where_fingerprint(self, node):
+        """
+        Returns (fingerprint, parameters) of a WHERE node, None when the node
+        is not made of column lookups on plain values.
+        """
+        if isinstance(node, WhereNode):
+            children = []
+            params = []
+            for child in node.children:
+                shape = self.where_fingerprint(child)
+                if shape is None:
+                    return None
+                children.append(shape[0])
+                params.extend(shape[1])
+            return (node.connector, node.negated, tuple(children)), params
+        if (not isinstance(node, BuiltinLookup) or type(node.lhs) is not Col or node.bilateral_transforms
+                or not node.rhs_is_direct_value() or hasattr(node.rhs, 'resolve_expression')):
+            return None
+        lhs = (node.lhs.alias, node.lhs.target, node.lhs.output_field)
+        if isinstance(node, IsNull):
+            # IS NULL / IS NOT NULL, no parameter
+            return (IsNull, lhs, bool(node.rhs)), []
+        try:
+            # Placeholders and parameters of the value, e.g. (%s, %s, %s) for an IN list
+            rhs, params = node.process_rhs(self, self.connection)
+        except EmptyResultSet:
+            return None
+        if isinstance(rhs, list):
+            rhs = tuple(rhs)
+        return (node.__class__, lhs, rhs), list(params)
+
+    def get_cache_key(self, with_limits, with_col_aliases):
+        """
+        Returns (key, WHERE parameters) for the SQL cache, None when the query
+        cannot be cached.
+        """
+        query = self.query
+        if (query.model is None or query.annotations or query.extra or query.extra_tables
+                or query.extra_order_by or query.group_by is not None or query.distinct_fields
+                or getattr(query, 'combinator', None) or query.select_for_update
+                or not self.statement_hints):
+            return None
+        if not all(isinstance(o, str) for o in query.order_by):
+            return None
+        joins = []
+        for alias, join in query.alias_map.items():
+            if getattr(join, 'filtered_relation', None) is not None:
+                return None
+            joins.append((alias, join.table_name, getattr(join, 'join_type', None),
+                          getattr(join, 'parent_alias', None), getattr(join, 'join_field', None),
+                          query.alias_refcount[alias] > 0))
+        where = self.where_fingerprint(query.where)
+        if where is None:
+            return None
+        where, w_params = where
+        key = (query.model, tuple(joins), where, tuple(query.order_by), query.default_ordering,
+               query.standard_ordering, query.distinct, query.default_cols, tuple(query.values_select),
+               freeze_key(query.select_related), query.deferred_loading[0] and frozenset(query.deferred_loading[0]),
+               query.deferred_loading[1], query.low_mark, query.high_mark, with_limits, with_col_aliases,
+               freeze_key(self.get_hints()))
+        return key, tuple(w_params)
+
+    #===========================================================================
+    # OR to UNION rewrite (OpenEdgeQuerySet.or_to_union())
+    #
+    # The OpenEdge optimizer often scans the whole table for WHERE a = ? OR b = ?
+    # even when a and b are indexed. The query is sent as one SELECT per OR
+    # branch, each one able to use its index. When the select list has the
+    # primary key (or a unique column) or the query is DISTINCT, the branches
+    # are joined by UNION, which only removes the rows found by several
+    # branches. Otherwise UNION would also merge the equal rows of the table,
+    # the branches are joined by UNION ALL and each one excludes the rows of
+    # the previous branches (see NotMatched). Only applied to the single table
+    # queries with a top level OR (or an AND containing one OR) of column
+    # lookups, without slice, grouping or annotation, ordered by selected
+    # columns (the ORDER BY of a UNION uses the column positions).
+    #===========================================================================
+    def get_union_branches(self, with_limits, exclusive=False):
+        """
+        Returns the WHERE nodes of the UNION branches, or None when the
+        rewrite does not apply. The branches are exclusive for a UNION ALL.
+        """
+        query = self.query
+        if ((with_limits and (query.low_mark or query.high_mark is not None)) or query.annotations
+                or query.extra or query.extra_tables or query.group_by is not None or query.distinct_fields
+                or getattr(query, 'combinator', None) or query.select_for_update or query.select_related
+                or not self.statement_hints):
+            return None
+        if len([a for a in query.alias_map if query.alias_refcount[a]]) > 1:
+            return None
+        where = query.where
+        if where.negated:
+            return None
+        if where.connector == OR:
+            common, alternatives = [], where.children
+        else:
+            ors = [c for c in where.children if getattr(c, 'connector', None) == OR and not c.negated]
+            if len(ors) != 1:
+                return None
+            common = [c for c in where.children if c is not ors[0]]
+            alternatives = ors[0].children
+        if len(alternatives) < 2 or not all(self.is_indexable(c) for c in alternatives):
+            return None
+        branches = []
+        for i, alternative in enumerate(alternatives):
+            children = common + [alternative]
+            if exclusive and i:
+                children.append(NotMatched(alternatives[:i]))
+            branches.append(where.__class__(children=children, connector=AND))
+        return branches
+
+    def is_indexable(self, node):
+        """
+        True for a column lookup an index can serve, or an AND of them.
+        """
+        if hasattr(node, 'children'):
+            return (node.connector == AND and not node.negated
+                    and all(self.is_indexable(c) for c in node.children))
+        return (getattr(node, 'lookup_name', None) in INDEXABLE_LOOKUPS
+                and getattr(node.lhs, 'target', None) is not None and not hasattr(node.rhs, 'as_sql'))
+
+    def as_union_sql(self, with_limits, with_col_aliases):
+        """
+        Returns the SQL of the query rewritten as a UNION of its OR branches,
+        or None when the rewrite does not apply.
+        """
+        if self.get_union_branches(with_limits) is None:
+            return None
+        refcounts_before = self.query.alias_refcount.copy()
+        try:
+            self.setup_query()
+            self.has_extra_select = False
+            distinct_rows = self.query.distinct or any(
+                getattr(column, 'target', None) is not None and (column.target.primary_key or column.target.unique)
+                for column, _, _ in self.select)
+            ordering = []
+            for expr, _ in self.get_order_by():
+                column = getattr(expr, 'expression', None)
+                positions = [i for i, (selected, _, _) in enumerate(self.select) if selected == column]
+                if not positions:
+                    return None
+                ordering.append('%d%s' % (positions[0] + 1, ' DESC' if expr.descending else ''))
+        finally:
+            self.query.reset_refcounts(refcounts_before)
+
+        branches = self.get_union_branches(with_limits, exclusive=not distinct_rows)
+        parts, params = [], []
+        for branch in branches:
+            query = self.query.clone()
+            query.where = branch
+            query.clear_ordering(force_empty=True)
+            try:
+                sql, branch_params = query.get_compiler(connection=self.connection).compile_query(
+                    with_limits=False, with_col_aliases=with_col_aliases)
+            except EmptyResultSet:
+                continue
+            parts.append(sql)
+            params.extend(branch_params)
+        if not parts:
+            raise EmptyResultSet
+        if distinct_rows:
+            sql = ' UNION '.join(parts)
+        else:
+            # The branches exclude each other, the equal rows are kept
+            sql = ' UNION ALL '.join(parts)
+        if ordering:
+            sql += ' ORDER BY %s' % ', '.join(ordering)
+        return sql, tuple(params)
+
+    ## with_limits defaults to True as in Django, otherwise the TOP / OFFSET
+    ## clauses of a sliced queryset were never emitted by execute_sql()
+    def as_sql(self, with_limits=True, with_col_aliases=False, subquery=False):
+        """
+        Creates the SQL for this query. Returns the SQL string and list of
+        parameters, from the SQL cache when it is enabled.
+        """
+        if getattr(self.query, 'oe_or_union', False) and not subquery:
+            union = self.as_union_sql(with_limits, with_col_aliases)
+            if union is not None:
+                return union
+        cache = self.connection.sql_cache
+        if cache is None or subquery:
+            return self.compile_query(with_limits, with_col_aliases, subquery)
+        shape = self.get_cache_key(with_limits, with_col_aliases)
+        if shape is None:
+            return self.compile_query(with_limits, with_col_aliases, subquery)
+        key, w_params = shape
+        entry = cache.get(key)
+        if entry is not None:
+            sql, self.select, self.klass_info, self.annotation_col_map, self.col_count, self.has_extra_select = entry
+            self.subquery = subquery
+            self.where, self.having = self.query.where.split_having()
+            return sql, w_params
+        sql, params = self.compile_query(with_limits, with_col_aliases, subquery)
+        # Only cached when the WHERE clause gives all the parameters
+        if tuple(params) == w_params:
+            cache.set(key, (sql, self.select, self.klass_info, self.annotation_col_map,
+                            self.col_count, getattr(self, 'has_extra_select', False)))
+        return sql, params
+
+    def compile_query(self, with_limits=True, with_col_aliases=False, subquery=False):
         """
         Creates the SQL for this query. Returns the SQL string and list of
         parameters.
@@ -73,7 +637,7 @@ class SQLCompiler(compiler.SQLCompiler):
         refcounts_before = self.query.alias_refcount.copy()
         try:
             extra_select, order_by, group_by = self.pre_sql_setup()
-            distinct_fields = self.get_distinct()
+            distinct_fields, distinct_params = self.get_distinct()
 
             # This must come after 'select', 'ordering', and 'distinct' -- see
             # docstring of get_from_clause() for details.
@@ -85,7 +649,9 @@ class SQLCompiler(compiler.SQLCompiler):
             result = ['SELECT']
 
             if self.query.distinct:
-                result.append(self.connection.ops.distinct_sql(distinct_fields))
+                distinct_result, distinct_params = self.connection.ops.distinct_sql(distinct_fields, distinct_params)
+                result += distinct_result
+                params += distinct_params
 
             out_cols = []
             col_idx = 1
@@ -306,6 +872,9 @@ class SQLCompiler(compiler.SQLCompiler):
         
         if not result_type:
             result_type = NO_RESULTS
+        in_chunks = self.get_in_chunks(result_type)
+        if in_chunks is not None:
+            return self.execute_in_chunks(in_chunks, result_type, chunked_fetch, chunk_size)
         try:
             sql, params = self.as_sql()
             if not sql:
@@ -317,10 +886,17 @@ class SQLCompiler(compiler.SQLCompiler):
                 return
 
         ## 20170627 Force nolock pour les select
-        if sql.split()[0] == "SELECT":
-            sql+=" WITH (NOLOCK)"
+        ## NOLOCK / READPAST now come from the hints of the query
+        sql += self.statement_hint_sql()
 
-        cursor = self.connection.cursor()
+        #=======================================================================
+        # QuerySet.iterator() gets a dedicated cursor, read by chunks while
+        # the iterator is consumed
+        #=======================================================================
+        if chunked_fetch:
+            cursor = self.connection.chunked_cursor()
+        else:
+            cursor = self.connection.cursor()
         try:
             cursor.execute(sql, params)
         except Exception:
@@ -344,11 +920,13 @@ class SQLCompiler(compiler.SQLCompiler):
             cursor.close()
             return
 
+        if not cursor.streaming or not chunk_size:
+            chunk_size = self.connection.fetch_size
         result = cursor_iter(
             cursor, self.connection.features.empty_fetchmany_value,
-            self.col_count
+            self.col_count, chunk_size
         )
-        if not self.connection.features.can_use_chunked_reads:            
+        if not cursor.streaming:            
             ## 20140412 Django 1.10
             return list(result)
 
@@ -422,6 +1000,8 @@ def order_modified_iter(cursor, trim, sentinel):
         yield [r[:-trim] for r in rows]
 
 class SQLInsertCompiler(SQLCompiler):
+    statement_hints = False
+
     def placeholder(self, field, val):
         if field is None:
             # A field value of None means the value is raw.
@@ -542,10 +1122,14 @@ class SQLInsertCompiler(SQLCompiler):
         if can_bulk:            
             #import pdb; pdb.set_trace()
             self.bulk_load=True
+            self.bulk_fields=(fields, 0)
             tabID=None            
             if hasIdCol is False and table_has_col_id is True:
+                self.bulk_fields=(fields, 1)
+                ## Ids reserved by blocks, see SequenceAllocator in operations.py
+                ids = self.connection.ops.get_autoinc_keyvals(opts.db_table, 'id',self.connection.ops.max_name_length(),cursor,len(values))
                 for i,v in enumerate(values):
-                    values[i].append(self.connection.ops.get_autoinc_keyval(opts.db_table, 'id',self.connection.ops.max_name_length(),cursor))
+                    values[i].append(ids[i])
                     #======================20131101=====================================
                     # values[i].append(cursor.execute('select id_%s.nextval from dual'%opts.db_table[:self.connection.ops.max_name_length()-3]).fetchone()[0])
                     #===========================================================
@@ -566,7 +1150,7 @@ class SQLInsertCompiler(SQLCompiler):
             else:
                 result[-1]+=')'
             
-            import pdb; pdb.set_trace()
+            #import pdb; pdb.set_trace()
             return [(" ".join(result), tuple(params))]       
             
             
@@ -581,6 +1165,9 @@ class SQLInsertCompiler(SQLCompiler):
             for sql, params in sql_param:                            
                 cursor.execute(sql, params)
         else:      
+            if self.connection.fast_executemany:
+                ## Parameter types for the array binding (FAST_EXECUTEMANY)
+                cursor.setinputsizes(self.connection.ops.bulk_input_sizes(*self.bulk_fields))
             cursor.executemany(sql_param[0][0],sql_param[0][1])
         
         #import pdb; pdb.set_trace()
@@ -599,9 +1186,20 @@ class SQLInsertCompiler(SQLCompiler):
                 self.query.model._meta.db_table, self.query.model._meta.pk.column)
 
 class SQLUpdateCompiler(compiler.SQLUpdateCompiler, SQLCompiler):
+    statement_hints = False
+
+#===============================================================================
+# count() (and aggregate()) of a sliced, distinct or annotated queryset :
+# SELECT COUNT(*) FROM (inner query) subquery. The inner query only selects the
+# primary key when it can (Django get_aggregation), not all the columns of a
+# wide table, and it has no ORDER BY unless a slice needs it.
+#===============================================================================
+class SQLAggregateCompiler(compiler.SQLAggregateCompiler, SQLCompiler):
     pass
 
 class SQLDeleteCompiler(compiler.SQLDeleteCompiler,SQLCompiler):
+    statement_hints = False
+
     def as_sql(self):
         """
         Creates the SQL for this query. Returns the SQL string and list of
@@ -664,14 +1262,18 @@ class SQLDeleteCompiler(compiler.SQLDeleteCompiler,SQLCompiler):
 #         #=======================================================================
 #         return ' '.join(result), tuple(params)
 
-def cursor_iter(cursor, sentinel, col_count):
+def cursor_iter(cursor, sentinel, col_count, itersize=GET_ITERATOR_CHUNK_SIZE):
     """
     Yields blocks of rows from a cursor and ensures the cursor is closed when
     done.
     """
     try:
-        for rows in iter((lambda: cursor.fetchmany(GET_ITERATOR_CHUNK_SIZE)),
+        for rows in iter((lambda: cursor.fetchmany(itersize)),
                          sentinel):
-            yield [r[0:col_count] for r in rows]
+            # Rows are already tuples, slice them only for extra columns
+            if len(rows[0]) == col_count:
+                yield rows
+            else:
+                yield [r[0:col_count] for r in rows]
     finally:
         cursor.close()        
\ No newline at end of file
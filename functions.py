@@ -0,0 +1,41 @@
+# -*- coding: utf-8 -*-
+'''
+OpenEdge adaptation of the Django date functions
+
+The date extraction and truncation SQL of DatabaseOperations repeats the
+field expression (e.g. the ISO week, the truncation to the month). The
+as_openedge() methods added here to Extract and Trunc (TruncDate, TruncTime...)
+compile the expression once and build the SQL of the Django as_sql() on
+FIELD_SQL : the parameters of a parameterised expression (a Case, a Cast of a
+value...) are repeated once per occurrence, see repeat_field_sql().
+'''
+from django.db.models.functions.datetime import Extract, TruncBase
+
+from django.db.backends.OpenEdge.operations import FIELD_SQL, repeat_field_sql
+
+
+class FieldPlaceholder(object):
+    """
+    Stands for the compiled field expression while the SQL is built.
+    """
+    def __init__(self, output_field):
+        self.output_field = output_field
+
+    def as_sql(self, compiler, connection):
+        return FIELD_SQL, []
+
+
+def repeated_field_as_openedge(self, compiler, connection):
+    """
+    as_sql() of the function built on FIELD_SQL, then the compiled expression put in place.
+    """
+    lhs = self.get_source_expressions()[0]
+    field_sql, field_params = compiler.compile(lhs)
+    function = self.copy()
+    function.set_source_expressions([FieldPlaceholder(lhs.output_field)])
+    return repeat_field_sql(function.as_sql(compiler, connection)[0], field_sql, field_params)
+
+
+# TruncDate and TruncTime are TruncBase subclasses
+Extract.as_openedge = repeated_field_as_openedge
+TruncBase.as_openedge = repeated_field_as_openedge
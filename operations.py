@@ -19,6 +19,203 @@ from django.db.backends.OpenEdge import query
 import datetime
 import time
 import decimal
+import threading
+
+import pyodbc as Database
+
+#===============================================================================
+# Sequence block allocation
+#
+# OpenEdge has no autoincrement column, the id of a new row comes from the
+# id_<table> sequence (see autoinc_sql). With a block size N > 1 the sequence
+# is created with INCREMENT BY N, so one NEXTVAL reserves the ids
+# [value, value + N - 1], which are handed out from a per-process cache.
+#
+#    'OPTIONS': {
+#        'SEQUENCE_BLOCK_SIZE': 1,                # default, one NEXTVAL per row
+#        'SEQUENCE_BLOCKS': {'myapp_item': 100},  # block size per table
+#    }
+#
+# These options give the INCREMENT BY of the sequences created by Django. The
+# blocks reserved by NEXTVAL always follow the real increment of the sequence,
+# read from SYSPROGRESS.SYSSEQUENCES and cached with the table metadata : a
+# sequence created before, still incrementing by 1, gives one id per NEXTVAL.
+# For an existing table : ALTER SEQUENCE PUB.id_<table> SET INCREMENT BY N
+# The DDL run through CursorWrapper.execute() clears the reserved blocks.
+#===============================================================================
+
+class SequenceAllocator(object):
+    """
+    Thread safe, per process cache of the id blocks reserved from sequences.
+    """
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._locks = {}
+        self._blocks = {}
+        self.refills = {}
+        self.allocated = 0
+
+    def allocate(self, key, block_size, fetch_block, count=1):
+        """
+        Returns count ids for the sequence key. fetch_block() reserves a new
+        block and returns its first id.
+        """
+        with self._lock:
+            lock = self._locks.get(key)
+            if lock is None:
+                lock = self._locks[key] = threading.Lock()
+
+        ids = []
+        with lock:
+            block = self._blocks.get(key)
+            while len(ids) < count:
+                if block is None or block[0] > block[1]:
+                    start = int(fetch_block())
+                    block = self._blocks[key] = [start, start + block_size - 1]
+                    self.refills[key] = self.refills.get(key, 0) + 1
+                taken = min(count - len(ids), block[1] - block[0] + 1)
+                ids.extend(range(block[0], block[0] + taken))
+                block[0] += taken
+        with self._lock:
+            self.allocated += count
+        return ids
+
+    def clear(self, key=None, alias=None):
+        """
+        Forget the reserved blocks (of one sequence, of one database alias or
+        of all), the unused ids are lost.
+        """
+        with self._lock:
+            if key is not None:
+                self._blocks.pop(key, None)
+            elif alias is not None:
+                for k in [k for k in self._blocks if k[0] == alias]:
+                    del self._blocks[k]
+            else:
+                self._blocks.clear()
+
+sequence_allocator = SequenceAllocator()
+
+#===============================================================================
+# Parameter types of the bulk inserts (pyodbc setinputsizes()), by Django
+# internal type, following DatabaseCreation.data_types. The column size of
+# the varchar types is taken from max_length. TextField is not mapped, its
+# column width is not known from the model : an insert with a text column
+# gets no input sizes, pyodbc sizes the parameters from the values.
+#===============================================================================
+BULK_INPUT_TYPES = {
+    'AutoField':         (Database.SQL_INTEGER, 0, 0),
+    'BigIntegerField':   (Database.SQL_BIGINT, 0, 0),
+    'BooleanField':      (Database.SQL_INTEGER, 0, 0),
+    'CharField':         (Database.SQL_VARCHAR, None, 0),
+    'CommaSeparatedIntegerField': (Database.SQL_VARCHAR, None, 0),
+    'DateField':         (Database.SQL_TYPE_DATE, 0, 0),
+    'DateTimeField':     (Database.SQL_TYPE_TIMESTAMP, 0, 0),
+    'FileField':         (Database.SQL_VARCHAR, None, 0),
+    'FilePathField':     (Database.SQL_VARCHAR, None, 0),
+    'FloatField':        (Database.SQL_DOUBLE, 0, 0),
+    'IntegerField':      (Database.SQL_INTEGER, 0, 0),
+    'IPAddressField':    (Database.SQL_VARCHAR, 15, 0),
+    'GenericIPAddressField': (Database.SQL_VARCHAR, 20, 0),
+    'NullBooleanField':  (Database.SQL_INTEGER, 0, 0),
+    'PositiveIntegerField': (Database.SQL_INTEGER, 0, 0),
+    'PositiveSmallIntegerField': (Database.SQL_SMALLINT, 0, 0),
+    'SlugField':         (Database.SQL_VARCHAR, None, 0),
+    'SmallIntegerField': (Database.SQL_SMALLINT, 0, 0),
+    'TimeField':         (Database.SQL_TYPE_TIME, 0, 0),
+}
+
+#===============================================================================
+# Table metadata cache
+#
+# The INSERT compiler has to know if a table has the "id" column emulating the
+# autoincrement (see has_id_col), which costs a sysprogress.syscolumns query.
+# The answer is cached per process, keyed by database alias, owner and table,
+# with the truncated table name and the sequence name. The cache is filled
+# lazily, or for all the installed models when a connection is set up with :
+#
+#    'OPTIONS': {'PRELOAD_TABLE_METADATA': True}
+#
+# The DDL run through CursorWrapper.execute() clears it. After a schema change
+# made outside of Django, call connection.ops.table_metadata.clear().
+#===============================================================================
+
+class TableMetadata(object):
+    """
+    Catalog information of a table used by the INSERT compiler.
+    """
+    def __init__(self, name, has_id, seqname, seq_increment=None):
+        self.name = name
+        self.has_id = has_id
+        self.seqname = seqname
+        # INCREMENT BY of the sequence, None until it is read
+        self.seq_increment = seq_increment
+
+class TableMetadataCache(object):
+    """
+    Thread safe, per process cache of TableMetadata.
+    """
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._tables = {}
+        self._preloaded = set()
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, key):
+        with self._lock:
+            entry = self._tables.get(key)
+            if entry is None:
+                self.misses += 1
+            else:
+                self.hits += 1
+        return entry
+
+    def set(self, key, entry):
+        with self._lock:
+            self._tables[key] = entry
+        return entry
+
+    def is_preloaded(self, alias, owner):
+        return (alias, owner) in self._preloaded
+
+    def preload(self, alias, owner, entries):
+        with self._lock:
+            self._tables.update(entries)
+            self._preloaded.add((alias, owner))
+
+    def clear(self, alias=None):
+        """
+        Forget the cached tables, of one database alias or of all.
+        """
+        with self._lock:
+            if alias is None:
+                self._tables.clear()
+                self._preloaded.clear()
+            else:
+                for key in [k for k in self._tables if k[0] == alias]:
+                    del self._tables[key]
+                self._preloaded = set(k for k in self._preloaded if k[0] != alias)
+
+table_metadata = TableMetadataCache()
+
+#===============================================================================
+# Repeated field expression
+#
+# The date builders below and the Variance / StdDev aggregates (aggregates.py)
+# repeat their field expression. They are built on FIELD_SQL, replaced by the
+# compiled expression : its parameters are repeated once per occurrence, so
+# they follow the placeholders whatever the template is.
+#===============================================================================
+FIELD_SQL = '\x00field\x00'
+
+def repeat_field_sql(sql, field_sql, field_params):
+    """
+    Returns sql with field_sql in place of each FIELD_SQL, and the parameters
+    of field_sql repeated as many times.
+    """
+    count = sql.count(FIELD_SQL)
+    return sql.replace(FIELD_SQL, field_sql), tuple(field_params) * count
 
 class DatabaseOperations(BaseDatabaseOperations):
     #compiler_module = "OpenEdge.pyodbc.compiler"
@@ -33,17 +230,52 @@ class DatabaseOperations(BaseDatabaseOperations):
         self.MAX_INDEX_NAME=self.MAX_TABLE_NAME - 2
         self.MAX_CONSTRAINT_NAME=self.max_name_length()
         self.MAX_SEQNAME=self.MAX_TABLE_NAME - 3
+        self.table_metadata = table_metadata
+        self.sequence_allocator = sequence_allocator
         
 
+    #===========================================================================
+    # Date and time functions
+    #
+    # OpenEdge scalar functions : YEAR, QUARTER, MONTH, DAYOFMONTH, DAYOFWEEK
+    # (1 = Sunday, as the Django week_day), DAYOFYEAR, HOUR, MINUTE, SECOND,
+    # ADD_MONTHS, TIMESTAMPADD. A date plus an integer is a date.
+    # The ISO week is computed from the Thursday of the week of the date.
+    # The time zone (tzname) is ignored, OpenEdge has no conversion function.
+    # The field expression is repeated in some expressions : the Extract and
+    # Trunc functions build them on FIELD_SQL (see functions.py), the
+    # parameters of a parameterised expression are repeated with it.
+    #===========================================================================
+    def iso_weekday_sql(self, field_name):
+        """
+        Day of the week of a date, 1 = Monday to 7 = Sunday.
+        """
+        return "(MOD(DAYOFWEEK(%s) + 5, 7) + 1)" % field_name
+
+    def iso_thursday_sql(self, field_name):
+        """
+        The Thursday of the ISO week of a date, its year is the ISO year.
+        """
+        return "(%s + (4 - %s))" % (field_name, self.iso_weekday_sql(field_name))
+
     def date_extract_sql(self, lookup_type, field_name):
         """
         Given a lookup_type of 'year', 'month', 'day' or 'week_day', returns
         the SQL that extracts a value from the given date field field_name.
         """
         if lookup_type == 'week_day':
-            return "DATEPART(dw, %s)" % field_name
-        else:
-            return "DATEPART(%s, %s)" % (lookup_type, field_name)
+            return "DAYOFWEEK(%s)" % field_name
+        if lookup_type == 'iso_week_day':
+            return self.iso_weekday_sql(field_name)
+        if lookup_type == 'day':
+            return "DAYOFMONTH(%s)" % field_name
+        if lookup_type == 'week':
+            return "(FLOOR((DAYOFYEAR(%s) - 1) / 7) + 1)" % self.iso_thursday_sql(field_name)
+        if lookup_type == 'iso_year':
+            return "YEAR(%s)" % self.iso_thursday_sql(field_name)
+        if lookup_type in ('year', 'quarter', 'month', 'hour', 'minute', 'second'):
+            return "%s(%s)" % (lookup_type.upper(), field_name)
+        raise NotImplementedError("OpenEdge does not support the %r date extraction." % lookup_type)
 
     def date_trunc_sql(self, lookup_type, field_name):
         """
@@ -52,13 +284,63 @@ class DatabaseOperations(BaseDatabaseOperations):
         the given specificity.
         """
         if lookup_type == 'year':
-            return "Convert(datetime, Convert(varchar, DATEPART(year, %s)) + '/01/01')" % field_name
+            return "(%s - (DAYOFYEAR(%s) - 1))" % (field_name, field_name)
+        if lookup_type == 'quarter':
+            return "ADD_MONTHS(%s, -MOD(MONTH(%s) - 1, 3))" % (self.date_trunc_sql('month', field_name), field_name)
         if lookup_type == 'month':
-            return "Convert(datetime, Convert(varchar, DATEPART(year, %s)) + '/' + Convert(varchar, DATEPART(month, %s)) + '/01')" % (field_name, field_name)
+            return "(%s - (DAYOFMONTH(%s) - 1))" % (field_name, field_name)
+        if lookup_type == 'week':
+            return "(%s - (%s - 1))" % (field_name, self.iso_weekday_sql(field_name))
         if lookup_type == 'day':
-            return "Convert(datetime, Convert(varchar(12), %s, 112))" % field_name
+            return field_name
+        raise NotImplementedError("OpenEdge does not support the %r date truncation." % lookup_type)
 
-    
+    def datetime_cast_date_sql(self, field_name, tzname):
+        return "CAST(%s AS DATE)" % field_name
+
+    def datetime_cast_time_sql(self, field_name, tzname):
+        return "CAST(%s AS TIME)" % field_name
+
+    def datetime_extract_sql(self, lookup_type, field_name, tzname):
+        """
+        Extraction from a timestamp, the time parts from its TIME, the others from its DATE.
+        """
+        if lookup_type in ('hour', 'minute', 'second'):
+            return self.time_extract_sql(lookup_type, self.datetime_cast_time_sql(field_name, tzname))
+        return self.date_extract_sql(lookup_type, self.datetime_cast_date_sql(field_name, tzname))
+
+    def datetime_trunc_sql(self, lookup_type, field_name, tzname):
+        """
+        Truncation of a timestamp, the date parts are truncated on its DATE,
+        the time parts are added back to the midnight of its DATE.
+        """
+        date_sql = self.datetime_cast_date_sql(field_name, tzname)
+        midnight = "CAST(%s AS TIMESTAMP)" % date_sql
+        if lookup_type in ('hour', 'minute', 'second'):
+            return self.time_add_sql(lookup_type, self.datetime_cast_time_sql(field_name, tzname), midnight)
+        return "CAST(%s AS TIMESTAMP)" % self.date_trunc_sql(lookup_type, date_sql)
+
+    def time_add_sql(self, lookup_type, time_sql, timestamp_sql):
+        """
+        Adds the hours (minutes, seconds) of time_sql to timestamp_sql.
+        """
+        if lookup_type == 'hour':
+            return "TIMESTAMPADD(SQL_TSI_HOUR, HOUR(%s), %s)" % (time_sql, timestamp_sql)
+        if lookup_type == 'minute':
+            return "TIMESTAMPADD(SQL_TSI_MINUTE, HOUR(%s) * 60 + MINUTE(%s), %s)" % (time_sql, time_sql, timestamp_sql)
+        return ("TIMESTAMPADD(SQL_TSI_SECOND, HOUR(%s) * 3600 + MINUTE(%s) * 60 + SECOND(%s), %s)"
+                % (time_sql, time_sql, time_sql, timestamp_sql))
+
+    def time_extract_sql(self, lookup_type, field_name):
+        return self.date_extract_sql(lookup_type, field_name)
+
+    def time_trunc_sql(self, lookup_type, field_name):
+        """
+        Truncation of a TIME, built on the midnight of the current day.
+        """
+        if lookup_type not in ('hour', 'minute', 'second'):
+            raise NotImplementedError("OpenEdge does not support the %r time truncation." % lookup_type)
+        return "CAST(%s AS TIME)" % self.time_add_sql(lookup_type, field_name, "CAST(CURDATE() AS TIMESTAMP)")
 
     def fulltext_search_sql(self, field_name):
         """
@@ -313,6 +595,34 @@ class DatabaseOperations(BaseDatabaseOperations):
         ##print('>>> return_insert_id ',tblname)
         pass
     
+    def bulk_input_sizes(self, fields, OEid=0):
+        """
+        Returns the setinputsizes() list of a bulk insert of fields (with the
+        emulated id column when OEid), or None when a field type is not mapped.
+        """
+        sizes = []
+        for field in fields:
+            if field is None:
+                # Model without fields to insert (SQLInsertCompiler has_fields False)
+                return None
+            if field.is_relation:
+                field = field.target_field
+            internal_type = field.get_internal_type()
+            if internal_type == 'DecimalField':
+                sizes.append((Database.SQL_DECIMAL, field.max_digits, field.decimal_places))
+                continue
+            if internal_type not in BULK_INPUT_TYPES:
+                return None
+            sql_type, size, digits = BULK_INPUT_TYPES[internal_type]
+            if size is None:
+                size = field.max_length
+                if not size:
+                    return None
+            sizes.append((sql_type, size, digits))
+        if OEid:
+            sizes.append(BULK_INPUT_TYPES['AutoField'])
+        return sizes
+
     def bulk_insert_sql(self, fields, num_values,OEid=0):
         #import pdb; pdb.set_trace()        
         items_sql= "(%s)" % ", ".join(["%s"] * (len(fields)+OEid))
@@ -349,26 +659,107 @@ class DatabaseOperations(BaseDatabaseOperations):
         This SQL is executed when a table is created.
         """
         
-        idSequence='CREATE SEQUENCE PUB.%s_%s START WITH 0, INCREMENT BY 1, MINVALUE 0, NOCYCLE'%(column,table[:self.MAX_SEQNAME])        
+        idSequence='CREATE SEQUENCE PUB.%s_%s START WITH 0, INCREMENT BY %d, MINVALUE 0, NOCYCLE'%(column,table[:self.MAX_SEQNAME],self.sequence_block_size(table))        
         return [idSequence]
 
+    def sequence_block_size(self, table):
+        """
+        Returns the count of ids reserved by each NEXTVAL of the sequence of the table.
+        """
+        options = self.connection.settings_dict.get('OPTIONS', {})
+        return options.get('SEQUENCE_BLOCKS', {}).get(table, options.get('SEQUENCE_BLOCK_SIZE', 1))
+
     def get_autoinc_keyval(self, table, column,max_len,cursor):
         """
         Function used to simulate the auto incremented key.
         Returns the next value of the sequence associate to the table.
         
         """
-        cursor.execute('select id_%s.nextval from dual'%table[:max_len-3])
-        return cursor.fetchone()[0]   
+        return self.get_autoinc_keyvals(table, column, max_len, cursor, 1)[0]
+
+    def get_autoinc_keyvals(self, table, column, max_len, cursor, count):
+        """
+        Returns count values for the auto incremented key, taken from the
+        reserved blocks of the sequence when its increment is greater than 1.
+        """
+        seqname = self.sequence_name(table, max_len)
+        block_size = self.sequence_increment(table, cursor, self.connection.owner)
+
+        def nextval():
+            cursor.execute('select %s.nextval from dual'%seqname)
+            return cursor.fetchone()[0]
+
+        if block_size <= 1:
+            return [nextval() for i in range(count)]
+        return sequence_allocator.allocate((self.connection.alias, seqname), block_size, nextval, count)
+
+    def sequence_name(self, table, max_len=None):
+        """
+        Returns the name of the sequence emulating the autoincrement of the table.
+        """
+        return 'id_%s'%table[:(max_len or self.max_name_length())-3]
+
+    def read_sequence_increments(self, cursor, owner, seqname=None):
+        """
+        Returns {sequence name (upper case): increment} from the catalog, for
+        one sequence or all the sequences of owner. Empty when the catalog
+        cannot be read.
+        """
+        sql = 'select "SEQ-NAME", "SEQ-INCR" from sysprogress.syssequences where "SEQ-OWNER" = \'%s\''%owner
+        if seqname is not None:
+            sql += ' and UPPER("SEQ-NAME") = \'%s\''%seqname.upper()
+        try:
+            rows = cursor.execute(sql).fetchall()
+        except Database.Error:
+            return {}
+        return dict((row[0].upper(), int(row[1])) for row in rows)
+
+    def sequence_increment(self, table, cursor, owner):
+        """
+        Returns the count of ids reserved by each NEXTVAL, the increment of the
+        sequence of the table. 1 when it is unknown, one id per NEXTVAL is
+        always safe.
+        """
+        entry = self.get_table_metadata(table, cursor, owner)
+        if entry.seq_increment is None:
+            increment = self.read_sequence_increments(cursor, owner, entry.seqname).get(entry.seqname.upper(), 1)
+            entry.seq_increment = max(increment, 1)
+        return entry.seq_increment
+
+    def get_table_metadata(self, table, cursor, owner):
+        """
+        Returns the TableMetadata of the table, from the cache or from the catalog.
+        """
+        name = table[:self.max_name_length()]
+        key = (self.connection.alias, owner, name)
+        entry = table_metadata.get(key)
+        if entry is None:
+            has_id = len(cursor.execute("select col from sysprogress.syscolumns where tbl = '%s' and owner = '%s' and col = 'id'"%(name,owner)).fetchall()) > 0
+            entry = table_metadata.set(key, TableMetadata(name, has_id, self.sequence_name(name)))
+        return entry
+
+    def preload_table_metadata(self, cursor, owner):
+        """
+        Fills the table metadata cache for all the installed models with one catalog query.
+        """
+        from django.apps import apps
+        if not apps.ready:
+            return
+        with_id = set(row[0] for row in cursor.execute("select tbl from sysprogress.syscolumns where owner = '%s' and col = 'id'"%owner).fetchall())
+        increments = self.read_sequence_increments(cursor, owner)
+        entries = {}
+        for model in apps.get_models(include_auto_created=True):
+            name = model._meta.db_table[:self.max_name_length()]
+            seqname = self.sequence_name(name)
+            entries[(self.connection.alias, owner, name)] = TableMetadata(name, name in with_id, seqname,
+                                                                          max(increments.get(seqname.upper(), 1), 1))
+        table_metadata.preload(self.connection.alias, owner, entries)
 
     def has_id_col(self, table, cursor, owner):
         """
         Return true if the table have an ID column        
         """        
-        if len(cursor.execute("select col from sysprogress.syscolumns where tbl = '%s' and owner = '%s' and col = 'id'"%(table,owner)).fetchall()) > 0 :
-            return True
-        else:
-            return False
+        return self.get_table_metadata(table, cursor, owner).has_id
     
     
     
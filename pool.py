@@ -0,0 +1,356 @@
+# -*- coding: utf-8 -*-
+'''
+In-process connection pool for the OpenEdge backend.
+
+OpenEdge SQL logins are expensive: the broker has to spawn or assign a SQL
+server process for each new connection. With CONN_MAX_AGE=0, Django opens and
+closes a connection for every request, so the pool keeps the physical
+connections and hands them out again when Django calls connect()/close().
+
+The pool is optional and configured through the OPTIONS of the database:
+
+    DATABASES = {
+        'default': {
+            ...
+            'OPTIONS': {
+                'POOL': {
+                    'MIN_SIZE': 2,          # connections opened on first use
+                    'MAX_SIZE': 10,         # keep it under the broker -Mn/-Ma limits
+                    'IDLE_TIMEOUT': 300,    # seconds before an idle connection is closed
+                    'MAX_LIFETIME': 3600,   # seconds before a connection is recycled
+                    'VALIDATE': True,       # run a query on the DUAL table before reuse
+                    'TIMEOUT': 30,          # seconds to wait for a free connection
+                },
+            },
+        },
+    }
+
+Pool activity is available from a connection with connection.pool.get_stats() :
+hits, misses, waits and evictions, with the current size of the pool.
+
+The StatementPool keeps the prepared statements of a connection, with
+OPTIONS 'MAX_PREPARED' (count of statements kept, 0 disables it). Its
+counters are available with connection.statement_pool.get_stats().
+'''
+
+import threading
+import time
+from collections import OrderedDict
+
+from django.db.utils import DatabaseError
+
+# Cache. Maps (connection string, validation query) to the ConnectionPool.
+_pools = {}
+_pools_lock = threading.Lock()
+
+
+def get_pool(connect, connstr, options, validation_sql=None):
+    """
+    Return the process wide pool for this connection string, creating it
+    from the POOL options if needed. connect is the DB-API connect function.
+    """
+    key = (connstr, validation_sql)
+    with _pools_lock:
+        pool = _pools.get(key)
+        if pool is None:
+            pool = _pools[key] = ConnectionPool(connect, connstr,
+                                                validation_sql=validation_sql,
+                                                min_size=options.get('MIN_SIZE', 0),
+                                                max_size=options.get('MAX_SIZE', 10),
+                                                idle_timeout=options.get('IDLE_TIMEOUT', 300),
+                                                max_lifetime=options.get('MAX_LIFETIME', 3600),
+                                                validate=options.get('VALIDATE', True),
+                                                timeout=options.get('TIMEOUT', 30))
+    return pool
+
+
+class PooledConnection(object):
+    """
+    A physical connection owned by the pool.
+    """
+    def __init__(self, connection):
+        self.connection = connection
+        self.created = time.time()
+        self.last_used = self.created
+
+
+class ConnectionPool(object):
+    """
+    Thread safe pool of pyodbc connections sharing the same connection string.
+    Idle connections are reused last in first out, so a busy worker keeps
+    getting the same (already set up) connection back.
+    """
+    def __init__(self, connect, connstr, validation_sql=None, min_size=0, max_size=10,
+                 idle_timeout=300, max_lifetime=3600, validate=True, timeout=30):
+        self.connect = connect
+        self.connstr = connstr
+        self.validation_sql = validation_sql
+        self.min_size = min_size
+        self.max_size = max(max_size, 1)
+        self.idle_timeout = idle_timeout
+        self.max_lifetime = max_lifetime
+        self.validate = validate and validation_sql is not None
+        self.timeout = timeout
+
+        self.stats = {'hits': 0, 'misses': 0, 'waits': 0, 'evictions': 0}
+        self._cond = threading.Condition(threading.Lock())
+        self._idle = []
+        self._in_use = {}
+        self._size = 0
+        self._filled = False
+
+    def get_stats(self):
+        """
+        Return the pool counters with the current pool size.
+        """
+        with self._cond:
+            stats = dict(self.stats)
+            stats['size'] = self._size
+            stats['idle'] = len(self._idle)
+            stats['in_use'] = len(self._in_use)
+        return stats
+
+    def acquire(self):
+        """
+        Hand out a connection, reusing an idle one when possible.
+        """
+        if not self._filled:
+            self._fill()
+
+        deadline = time.time() + self.timeout
+        waited = False
+        while True:
+            entry = None
+            reserved = False
+            with self._cond:
+                expired = self._pop_expired()
+                if self._idle:
+                    entry = self._idle.pop()
+                elif self._size < self.max_size:
+                    self._size += 1
+                    reserved = True
+                else:
+                    remaining = deadline - time.time()
+                    if remaining <= 0:
+                        raise DatabaseError("OpenEdge connection pool exhausted (MAX_SIZE=%d)" % self.max_size)
+                    if not waited:
+                        waited = True
+                        self.stats['waits'] += 1
+                    self._cond.wait(remaining)
+            self._close_all(expired)
+
+            if reserved:
+                entry = self._open()
+                with self._cond:
+                    self.stats['misses'] += 1
+            elif entry is None:
+                # Woken up, try again
+                continue
+            elif self.validate and not self._is_valid(entry):
+                self._discard(entry)
+                continue
+            else:
+                with self._cond:
+                    self.stats['hits'] += 1
+
+            entry.last_used = time.time()
+            with self._cond:
+                self._in_use[id(entry.connection)] = entry
+            return entry.connection
+
+    def release(self, connection):
+        """
+        Give a connection back to the pool. Pending work is rolled back so the
+        next user starts with a clean transaction.
+        """
+        with self._cond:
+            entry = self._in_use.pop(id(connection), None)
+        if entry is None:
+            # Not handed out by this pool
+            connection.close()
+            return
+
+        try:
+            connection.rollback()
+        except Exception:
+            self._discard(entry)
+            return
+
+        now = time.time()
+        if self.max_lifetime and now - entry.created > self.max_lifetime:
+            self._discard(entry)
+            return
+
+        entry.last_used = now
+        with self._cond:
+            self._idle.append(entry)
+            self._cond.notify()
+
+    def discard(self, connection):
+        """
+        Drop a connection handed out by the pool, e.g. when it became unusable.
+        """
+        with self._cond:
+            entry = self._in_use.pop(id(connection), None)
+        if entry is not None:
+            self._discard(entry)
+        else:
+            connection.close()
+
+    def close(self):
+        """
+        Close every idle connection. Connections in use are closed when released.
+        """
+        with self._cond:
+            idle, self._idle = self._idle, []
+            self._size -= len(idle)
+            self._cond.notify_all()
+        self._close_all(idle)
+
+    def _fill(self):
+        """
+        Open MIN_SIZE connections on first use.
+        """
+        with self._cond:
+            if self._filled:
+                return
+            self._filled = True
+            count = max(self.min_size - self._size, 0)
+            self._size += count
+        for i in range(count):
+            try:
+                entry = self._open()
+            except Exception:
+                # _open() already gave back the slot of the failed login
+                with self._cond:
+                    self._size -= count - i - 1
+                raise
+            with self._cond:
+                self._idle.append(entry)
+                self._cond.notify()
+
+    def _open(self):
+        # The slot is reserved in _size, the login is done without the lock held
+        try:
+            return PooledConnection(self.connect(self.connstr))
+        except Exception:
+            with self._cond:
+                self._size -= 1
+                self._cond.notify()
+            raise
+
+    def _is_valid(self, entry):
+        try:
+            cursor = entry.connection.cursor()
+            try:
+                cursor.execute(self.validation_sql).fetchone()
+            finally:
+                cursor.close()
+        except Exception:
+            return False
+        return True
+
+    def _pop_expired(self):
+        """
+        Remove the idle connections past IDLE_TIMEOUT or MAX_LIFETIME.
+        Must be called with the lock held, returns the connections to close.
+        """
+        now = time.time()
+        keep, expired = [], []
+        for entry in self._idle:
+            if self.max_lifetime and now - entry.created > self.max_lifetime:
+                expired.append(entry)
+            elif (self.idle_timeout and now - entry.last_used > self.idle_timeout
+                  and self._size - len(expired) > self.min_size):
+                expired.append(entry)
+            else:
+                keep.append(entry)
+        if expired:
+            self._idle = keep
+            self._size -= len(expired)
+            self.stats['evictions'] += len(expired)
+            self._cond.notify_all()
+        return expired
+
+    def _discard(self, entry):
+        with self._cond:
+            self._size -= 1
+            self.stats['evictions'] += 1
+            self._cond.notify()
+        self._close_all([entry])
+
+    def _close_all(self, entries):
+        for entry in entries:
+            try:
+                entry.connection.close()
+            except Exception:
+                pass
+
+
+class StatementPool(object):
+    """
+    Cursors of one connection kept with their prepared statement, keyed by
+    SQL text. pyodbc only skips the prepare when a cursor executes the same
+    SQL again, a statement found here is not parsed again by the server.
+    Used by one connection (thread), configured with OPTIONS 'MAX_PREPARED'.
+    """
+    def __init__(self, max_size):
+        self.max_size = max_size
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        # Incremented by clear(), the cursors checked out before are not taken back
+        self.generation = 0
+        self._cursors = OrderedDict()
+
+    def get_stats(self):
+        return {'hits': self.hits, 'misses': self.misses, 'evictions': self.evictions,
+                'size': len(self._cursors)}
+
+    def checkout(self, sql):
+        """
+        Returns the cursor which prepared sql, removed from the pool while it
+        is used, or None.
+        """
+        cursor = self._cursors.pop(sql, None)
+        if cursor is None:
+            self.misses += 1
+        else:
+            self.hits += 1
+        return cursor
+
+    def checkin(self, sql, cursor, generation):
+        """
+        Gives back a cursor after its statement was run. The result set is
+        closed, the prepared statement is kept.
+        """
+        if generation != self.generation or sql in self._cursors:
+            self._close_all([cursor])
+            return
+        try:
+            while cursor.nextset():
+                pass
+        except Exception:
+            self._close_all([cursor])
+            return
+        self._cursors[sql] = cursor
+        if len(self._cursors) > self.max_size:
+            _, evicted = self._cursors.popitem(last=False)
+            self.evictions += 1
+            self._close_all([evicted])
+
+    def clear(self):
+        """
+        Closes all the pooled cursors, e.g. when the connection is closed.
+        """
+        cursors = list(self._cursors.values())
+        self._cursors.clear()
+        self.generation += 1
+        self._close_all(cursors)
+
+    def _close_all(self, cursors):
+        for cursor in cursors:
+            try:
+                cursor.close()
+            except Exception:
+                pass
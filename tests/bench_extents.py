@@ -0,0 +1,61 @@
+# -*- coding: utf-8 -*-
+'''
+Benchmark of the extent decoding of OpenEdgeExtentField : the former
+re.sub / re.split passes of to_python() against the single pass decoder,
+for a column of character and integer extents.
+
+    python tests/bench_extents.py [rows]
+
+Needs Django only.
+'''
+import re
+import sys
+import time
+
+import openedge
+
+
+def former_char(value):
+    return [re.sub('<SEMICOLON>', ';', y) for y in [re.sub('<TILDE>', '~', x) for x in re.split(
+        ';', re.sub('~~', '<TILDE>', re.sub('~;', '<SEMICOLON>', value)))]]
+
+
+def former_int(value):
+    return [int(y) for y in re.split(';', value.replace('?', '0'))]
+
+
+def timed(func, values):
+    start = time.perf_counter()
+    result = [func(value) for value in values]
+    return time.perf_counter() - start, result
+
+
+def run(rows):
+    openedge.setup()
+    from django.db.backends.OpenEdge.OEmodels.OpenEdgeExtentField import OpenEdgeExtentField
+
+    chars = OpenEdgeExtentField(OEtype='char', OEextents=12)
+    ints = OpenEdgeExtentField(OEtype='int', OEextents=12)
+    char_values = ['ITEM%d;Blue;Large;~;sep;Cotton;?;;Batch %d;A~~B;Z;last' % (i, i) for i in range(rows)]
+    plain_values = ['ITEM%d;Blue;Large;Red;Green;Cotton;?;;Batch %d;AB;Z;last' % (i, i) for i in range(rows)]
+    int_values = [';'.join(str(i + j) for j in range(11)) + ';?' for i in range(rows)]
+
+    cases = [
+        ('char, escaped', former_char, chars, char_values),
+        ('char, plain', former_char, chars, plain_values),
+        ('int', former_int, ints, int_values),
+    ]
+    print('%d rows of 12 extents' % rows)
+    for name, former, field, values in cases:
+        former_time, former_result = timed(former, values)
+        current_time, current_result = timed(field.to_python, values)
+        assert current_result == former_result, name
+        many_start = time.perf_counter()
+        field.to_python_many(values)
+        many_time = time.perf_counter() - many_start
+        print('%-14s former %6.3f s   to_python %6.3f s (%4.1fx)   to_python_many %6.3f s (%4.1fx)' % (
+            name, former_time, current_time, former_time / current_time, many_time, former_time / many_time))
+
+
+if __name__ == '__main__':
+    run(int(sys.argv[1]) if len(sys.argv) > 1 else 100000)
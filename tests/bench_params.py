@@ -0,0 +1,71 @@
+# -*- coding: utf-8 -*-
+'''
+Benchmark of the executemany() parameter adaptation over a 100k rows list :
+the former per-value isinstance chain of format_params() against the
+per-column converter plan of CursorWrapper.format_params_list().
+
+    python tests/bench_params.py [rows]
+
+Needs Django and pyodbc, no database connection.
+'''
+import datetime
+import decimal
+import sys
+import time
+
+import openedge
+
+
+def former_format_params(params, driver_needs_utf8=True):
+    """
+    format_params() before the type dispatch.
+    """
+    fp = []
+    for p in params:
+        if isinstance(p, str):
+            if driver_needs_utf8:
+                fp.append(p.encode('utf-8').decode('ascii'))
+            else:
+                fp.append(p)
+        elif isinstance(p, type(True)):
+            if p:
+                fp.append(1)
+            else:
+                fp.append(0)
+        else:
+            fp.append(p)
+    return tuple(fp)
+
+
+def make_rows(count):
+    day = datetime.date(2020, 1, 1)
+    return [(i, 'Customer %d' % i, decimal.Decimal('%d.50' % i), day, i % 2 == 0, None)
+            for i in range(count)]
+
+
+def run(count):
+    openedge.setup()
+    from django.db import connections
+    from django.db.backends.OpenEdge.base import CursorWrapper
+
+    db = connections['default']
+    wrapper = CursorWrapper(None, True, 'iso8859-1', 'PUB', db.ops, db.creation, db)
+    rows = make_rows(count)
+
+    start = time.perf_counter()
+    former = [former_format_params(row) for row in rows]
+    former_time = time.perf_counter() - start
+
+    start = time.perf_counter()
+    planned = wrapper.format_params_list(rows)
+    planned_time = time.perf_counter() - start
+
+    assert [tuple(row) for row in planned] == former
+    print('%d rows' % count)
+    print('%-20s %8.3f s  %10.0f rows/s' % ('former', former_time, count / former_time))
+    print('%-20s %8.3f s  %10.0f rows/s' % ('format_params_list', planned_time, count / planned_time))
+    print('speedup              %8.1fx' % (former_time / planned_time))
+
+
+if __name__ == '__main__':
+    run(int(sys.argv[1]) if len(sys.argv) > 1 else 100000)
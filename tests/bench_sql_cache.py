@@ -0,0 +1,67 @@
+# -*- coding: utf-8 -*-
+'''
+Micro-benchmark of the compiled SQL cache (OPTIONS 'SQL_CACHE_SIZE') :
+SQLCompiler.as_sql() without cache, with the former cache key (the WHERE
+clause compiled on every call) and with the WHERE fingerprint.
+
+    python tests/bench_sql_cache.py [loops]
+
+Needs Django and pyodbc, no database connection.
+'''
+import sys
+import timeit
+
+import openedge
+
+
+def run(loops):
+    openedge.setup()
+    from django.db import connections, models
+    from django.db.backends.OpenEdge.base import SQLCache
+    from django.db.backends.OpenEdge.compiler import SQLCompiler
+
+    class BenchOrder(models.Model):
+        custnum = models.IntegerField()
+        carrier = models.CharField(max_length=30, null=True)
+        status = models.CharField(max_length=20)
+        total = models.DecimalField(max_digits=12, decimal_places=2)
+
+        class Meta:
+            app_label = 'openedge_bench'
+            ordering = ['custnum']
+
+    query = BenchOrder.objects.filter(
+        custnum__in=[1, 2, 3, 4], status='Shipped', total__gte=100, carrier__isnull=False,
+    ).exclude(status='Cancelled')[:20].query
+    connection = connections['default']
+
+    def compile_sql():
+        query.chain().get_compiler('default').as_sql()
+
+    def former_fingerprint(self, node):
+        # The former key : the WHERE clause compiled for every lookup of the cache
+        return self.compile(node)
+
+    fingerprint = SQLCompiler.where_fingerprint
+    cases = (('no cache', None, fingerprint),
+             ('former key', SQLCache(16), former_fingerprint),
+             ('fingerprint', SQLCache(16), fingerprint))
+    results = []
+    for name, cache, where_fingerprint in cases:
+        connection.sql_cache = cache
+        SQLCompiler.where_fingerprint = where_fingerprint
+        try:
+            best = min(timeit.repeat(compile_sql, number=loops, repeat=5))
+        finally:
+            SQLCompiler.where_fingerprint = fingerprint
+            connection.sql_cache = None
+        per_call = best / loops * 1e6
+        results.append(per_call)
+        hits = ' (%d hits, %d misses)' % (cache.hits, cache.misses) if cache is not None else ''
+        print('%-12s %8.1f us per query%s' % (name, per_call, hits))
+    print('speedup      %8.1fx over no cache, %.1fx over the former key' % (
+        results[0] / results[2], results[1] / results[2]))
+
+
+if __name__ == '__main__':
+    run(int(sys.argv[1]) if len(sys.argv) > 1 else 2000)
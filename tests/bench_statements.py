@@ -0,0 +1,64 @@
+# -*- coding: utf-8 -*-
+'''
+Micro-benchmark of the statement handling of CursorWrapper.execute() :
+the former inline rewriting (placeholders, ';' trimming, newline removal and
+CREATE/ALTER TABLE searches on every statement) against classify_statement().
+
+    python tests/bench_statements.py [loops]
+
+Needs Django and pyodbc, no database connection.
+'''
+import re
+import sys
+import timeit
+
+import openedge
+
+STATEMENTS = [
+    ('SELECT "PUB"."customer"."CustNum", "PUB"."customer"."Name" FROM "PUB"."customer" '
+     'WHERE "PUB"."customer"."CustNum" = %s', 1),
+    ('INSERT INTO "PUB"."order" ("OrderNum", "CustNum", "OrderDate", "Carrier") '
+     'VALUES (%s, %s, %s, %s)', 4),
+    ('UPDATE "PUB"."order" SET "Carrier" = %s WHERE "PUB"."order"."OrderNum" = %s', 2),
+    ('DELETE FROM "PUB"."orderline" WHERE "PUB"."orderline"."OrderNum" IN (%s, %s, %s)', 3),
+]
+
+
+def former_statement(sql, n_params):
+    """
+    Statement handling of execute() before classify_statement(), without the
+    DDL rewriting itself (never reached by DML).
+    """
+    sql = sql % tuple('?' * n_params)
+    if sql.endswith(';') is True:
+        sql = sql[:-1]
+    sql = sql.replace('\n', '')
+    if re.search('CREATE TABLE ', sql) is not None or re.search('ALTER TABLE ', sql) is not None:
+        pass
+    return sql
+
+
+def run(loops):
+    openedge.setup()
+    from django.db.backends.OpenEdge.base import classify_statement
+
+    def former():
+        for sql, n in STATEMENTS:
+            former_statement(sql, n)
+
+    def classified():
+        for sql, n in STATEMENTS:
+            classify_statement(sql, n)
+
+    results = []
+    for name, func in (('former', former), ('classify_statement', classified)):
+        best = min(timeit.repeat(func, number=loops, repeat=5))
+        per_call = best / (loops * len(STATEMENTS)) * 1e9
+        results.append(per_call)
+        print('%-20s %8.0f ns per statement' % (name, per_call))
+    print('speedup              %8.1fx' % (results[0] / results[1]))
+    print(classify_statement.cache_info())
+
+
+if __name__ == '__main__':
+    run(int(sys.argv[1]) if len(sys.argv) > 1 else 20000)
@@ -0,0 +1,60 @@
+# -*- coding: utf-8 -*-
+'''
+Test setup of the OpenEdge backend.
+
+The repository is the django.db.backends.OpenEdge package, it is registered
+under this name when it is not installed in Django. The default database
+uses the backend, the tests only compile SQL and never open a connection.
+
+The tests of the modules importing pyodbc (base.py, operations.py) are
+skipped when pyodbc cannot be loaded (no ODBC driver manager).
+'''
+import importlib.util
+import os
+import sys
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+PACKAGE = 'django.db.backends.OpenEdge'
+
+DATABASES = {
+    'default': {
+        'ENGINE': PACKAGE,
+        'NAME': 'sports2000',
+        'USER': 'test',
+        'PASSWORD': '',
+        'HOST': '',
+        'PORT': '',
+        'DEFAULTSCHEMA': 'PUB',
+        'TYPECNX': {'DSN': 'sports2000'},
+        'OPTIONS': {'IN_CHUNK_SIZE': 10},
+    },
+}
+
+
+def register_package():
+    """
+    Imports the repository as django.db.backends.OpenEdge.
+    """
+    if PACKAGE in sys.modules:
+        return sys.modules[PACKAGE]
+    import django.db.backends
+    spec = importlib.util.spec_from_file_location(PACKAGE, os.path.join(ROOT, '__init__.py'),
+                                                  submodule_search_locations=[ROOT])
+    module = importlib.util.module_from_spec(spec)
+    sys.modules[PACKAGE] = module
+    spec.loader.exec_module(module)
+    django.db.backends.OpenEdge = module
+    return module
+
+
+def setup():
+    """
+    Configures Django for the tests and the benchmarks.
+    """
+    import django
+    from django.conf import settings
+    register_package()
+    if not settings.configured:
+        settings.configure(DATABASES=DATABASES, INSTALLED_APPS=[], USE_TZ=False,
+                           SECRET_KEY='openedge-tests')
+        django.setup()
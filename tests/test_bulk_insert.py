@@ -0,0 +1,43 @@
+# -*- coding: utf-8 -*-
+'''
+Parameter types of the bulk inserts (DatabaseOperations.bulk_input_sizes).
+'''
+import pytest
+
+pyodbc = pytest.importorskip('pyodbc', exc_type=ImportError)
+
+from django.db import connections, models  # noqa: E402
+
+
+class BulkItem(models.Model):
+    code = models.CharField(max_length=12)
+    qty = models.IntegerField()
+    price = models.DecimalField(max_digits=9, decimal_places=2)
+    notes = models.TextField()
+
+    class Meta:
+        app_label = 'openedge_tests'
+
+
+def field(name):
+    return BulkItem._meta.get_field(name)
+
+
+def test_input_sizes_from_field_types():
+    ops = connections['default'].ops
+    assert ops.bulk_input_sizes([field('code'), field('qty'), field('price')], 1) == [
+        (pyodbc.SQL_VARCHAR, 12, 0),
+        (pyodbc.SQL_INTEGER, 0, 0),
+        (pyodbc.SQL_DECIMAL, 9, 2),
+        (pyodbc.SQL_INTEGER, 0, 0),
+    ]
+
+
+def test_no_fields_to_insert():
+    # SQLInsertCompiler passes [None] for a model with only its primary key
+    assert connections['default'].ops.bulk_input_sizes([None]) is None
+
+
+def test_text_column_is_not_bound_with_a_fixed_width():
+    ops = connections['default'].ops
+    assert ops.bulk_input_sizes([field('code'), field('notes')]) is None
@@ -0,0 +1,85 @@
+# -*- coding: utf-8 -*-
+'''
+Streamed result sets of QuerySet.iterator() : DatabaseWrapper.chunked_cursor().
+'''
+import copy
+
+import pytest
+
+pytest.importorskip('pyodbc', exc_type=ImportError)
+
+from django.db import connections  # noqa: E402
+
+from django.db.backends.OpenEdge import base  # noqa: E402
+
+SQL_CB_DELETE = 0
+
+
+class FakeConnection(object):
+    autocommit = True
+    commit_behavior = SQL_CB_DELETE
+
+    def __init__(self, connstr):
+        self.getinfo_calls = 0
+
+    def getinfo(self, info_type):
+        self.getinfo_calls += 1
+        return self.commit_behavior
+
+    def close(self):
+        pass
+
+
+class FakeCursor(object):
+    streaming = False
+
+
+@pytest.fixture
+def wrapper(monkeypatch):
+    monkeypatch.setattr(base.Database, 'connect', FakeConnection)
+    settings_dict = copy.deepcopy(connections['default'].settings_dict)
+    wrapper = connections['default'].__class__(settings_dict, alias='chunked')
+    wrapper.cursor = FakeCursor
+    yield wrapper
+    wrapper.in_atomic_block = False
+    wrapper.close()
+
+
+def test_no_stream_in_autocommit(wrapper):
+    wrapper.connect()
+    assert not wrapper.features.can_use_chunked_reads
+    assert not wrapper.chunked_cursor().streaming
+    assert wrapper.open_streams == 0
+
+
+def test_stream_in_atomic_block(wrapper):
+    wrapper.connect()
+    wrapper.in_atomic_block = True
+    assert wrapper.chunked_cursor().streaming
+    assert wrapper.open_streams == 1
+
+
+def test_stream_without_autocommit(wrapper):
+    wrapper.connect()
+    wrapper.autocommit = False
+    assert wrapper.chunked_cursor().streaming
+
+
+def test_stream_when_driver_preserves_cursors(wrapper, monkeypatch):
+    monkeypatch.setattr(FakeConnection, 'commit_behavior', base.SQL_CB_PRESERVE)
+    wrapper.connect()
+    assert wrapper.chunked_cursor().streaming
+
+
+def test_cursor_behavior_read_once_per_connection(wrapper):
+    wrapper.connect()
+    calls = wrapper.connection.getinfo_calls
+    for i in range(3):
+        wrapper.features.can_use_chunked_reads
+        wrapper.features.can_reuse_prepared_statements
+    assert wrapper.connection.getinfo_calls == calls == 2
+
+
+def test_feature_check_does_not_connect(wrapper):
+    assert not wrapper.features.can_use_chunked_reads
+    assert wrapper.connection is None
@@ -0,0 +1,105 @@
+# -*- coding: utf-8 -*-
+'''
+Date extraction / truncation and Variance / StdDev on a parameterised
+argument : the field expression is repeated in the SQL, its parameters have
+to be repeated with it (see repeat_field_sql() in operations.py).
+'''
+import datetime
+
+import pytest
+
+pytest.importorskip('pyodbc', exc_type=ImportError)
+
+from django.db import models  # noqa: E402
+from django.db.models import Q, StdDev, Value, Variance  # noqa: E402
+from django.db.models.functions import (  # noqa: E402
+    Coalesce, Extract, Trunc, TruncDate, TruncTime,
+)
+
+
+class DatedOrder(models.Model):
+    ordered = models.DateField()
+    shipped = models.DateTimeField()
+    slot = models.TimeField()
+    amount = models.IntegerField()
+
+    class Meta:
+        app_label = 'openedge_tests'
+
+
+DATE = Coalesce('ordered', Value(datetime.date(2020, 1, 1)), output_field=models.DateField())
+DATETIME = Coalesce('shipped', Value(datetime.datetime(2020, 1, 1, 12)), output_field=models.DateTimeField())
+TIME = Coalesce('slot', Value(datetime.time(12)), output_field=models.TimeField())
+
+DATE_PARTS = ['year', 'iso_year', 'quarter', 'month', 'day', 'week', 'week_day', 'iso_week_day']
+TIME_PARTS = ['hour', 'minute', 'second']
+
+
+def compiled(**annotations):
+    sql, params = DatedOrder.objects.values('id').annotate(**annotations).query.get_compiler('default').as_sql()
+    return sql, params
+
+
+def check_params(sql, params, value):
+    assert sql.count('%s') == len(params)
+    assert params and all(p == value for p in params)
+
+
+@pytest.mark.parametrize('kind', DATE_PARTS)
+def test_date_extract(kind):
+    sql, params = compiled(x=Extract(DATE, kind))
+    check_params(sql, params, datetime.date(2020, 1, 1))
+
+
+@pytest.mark.parametrize('kind', DATE_PARTS + TIME_PARTS)
+def test_datetime_extract(kind):
+    sql, params = compiled(x=Extract(DATETIME, kind))
+    check_params(sql, params, datetime.datetime(2020, 1, 1, 12))
+
+
+@pytest.mark.parametrize('kind', TIME_PARTS)
+def test_time_extract(kind):
+    sql, params = compiled(x=Extract(TIME, kind))
+    check_params(sql, params, datetime.time(12))
+
+
+@pytest.mark.parametrize('kind', ['year', 'quarter', 'month', 'week', 'day'])
+def test_date_trunc(kind):
+    sql, params = compiled(x=Trunc(DATE, kind, output_field=models.DateField()))
+    check_params(sql, params, datetime.date(2020, 1, 1))
+
+
+@pytest.mark.parametrize('kind', ['year', 'quarter', 'month', 'week', 'day', 'hour', 'minute', 'second'])
+def test_datetime_trunc(kind):
+    sql, params = compiled(x=Trunc(DATETIME, kind, output_field=models.DateTimeField()))
+    check_params(sql, params, datetime.datetime(2020, 1, 1, 12))
+
+
+@pytest.mark.parametrize('kind', TIME_PARTS)
+def test_time_trunc(kind):
+    sql, params = compiled(x=Trunc(TIME, kind, output_field=models.TimeField()))
+    check_params(sql, params, datetime.time(12))
+
+
+@pytest.mark.parametrize('function', [TruncDate, TruncTime])
+def test_datetime_casts(function):
+    sql, params = compiled(x=function(DATETIME))
+    check_params(sql, params, datetime.datetime(2020, 1, 1, 12))
+
+
+def test_week_repeats_the_parameters():
+    sql, params = compiled(x=Extract(DATE, 'week'))
+    assert len(params) > 1
+
+
+@pytest.mark.parametrize('aggregate', [Variance, StdDev])
+@pytest.mark.parametrize('sample', [False, True])
+def test_filtered_variance(aggregate, sample):
+    sql, params = compiled(x=aggregate('amount', sample=sample, filter=Q(amount__gt=100)))
+    check_params(sql, params, 100)
+    assert len(params) == 6
+
+
+def test_parameterised_variance():
+    sql, params = compiled(x=Variance(Coalesce('amount', Value(7)), sample=True))
+    check_params(sql, params, 7)
@@ -0,0 +1,119 @@
+# -*- coding: utf-8 -*-
+'''
+Extent decoding of OpenEdgeExtentField : single pass splitting of the
+escaped values and get_prep_value() / to_python() round trips.
+'''
+import datetime
+import decimal
+
+import pytest
+
+from django.core import exceptions
+
+from django.db.backends.OpenEdge.OEmodels.OpenEdgeExtentField import (
+    LazyExtents, OpenEdgeExtentField, split_extents, split_plain)
+
+
+@pytest.mark.parametrize('raw, items', [
+    ('AAA;BBB;CCC', ['AAA', 'BBB', 'CCC']),
+    ('AAA~;BBB;CCC', ['AAA;BBB', 'CCC']),
+    ('AAA~~~;~BBB;CCC', ['AAA~;~BBB', 'CCC']),
+    ('ABC~~D~;E~~~;', ['ABC~D;E~;']),
+    (';;', ['', '', '']),
+    ('A;;B;', ['A', '', 'B', '']),
+    ('~~;~;', ['~', ';']),
+    ('', ['']),
+])
+def test_split_extents(raw, items):
+    assert split_extents(raw) == items
+
+
+def test_split_plain():
+    assert split_plain('1;?;3') == ['1', '?', '3']
+
+
+@pytest.mark.parametrize('items', [
+    ['AAA', 'BBB', 'CCC', 'DDD'],
+    ['A;B', 'C~D', '~;', ';~', '~~;;'],
+    ['', 'x', '', ''],
+    ['trailing~', ';', '', 'é~è'],
+])
+def test_char_round_trip(items):
+    field = OpenEdgeExtentField(OEtype='char', OEextents=5)
+    assert field.to_python(field.get_prep_value(items)) == items
+
+
+def test_numeric_round_trip():
+    ints = OpenEdgeExtentField(OEtype='int', OEextents=4)
+    assert ints.to_python(ints.get_prep_value([1, -2, 0, 30000])) == [1, -2, 0, 30000]
+    decs = OpenEdgeExtentField(OEtype='dec', OEextents=3)
+    values = [decimal.Decimal('12345678901234567'), decimal.Decimal('-0.5'), decimal.Decimal('0')]
+    assert decs.to_python(decs.get_prep_value(values)) == values
+
+
+def test_unknown_values():
+    assert OpenEdgeExtentField(OEtype='int', OEextents=3).to_python('1;?;3') == [1, 0, 3]
+    assert OpenEdgeExtentField(OEtype='log', OEextents=3).to_python('1;?;0') == [True, False, False]
+    assert OpenEdgeExtentField(OEtype='char', OEextents=2).to_python('?;A') == ['?', 'A']
+
+
+def test_to_python_many():
+    field = OpenEdgeExtentField(OEtype='char', OEextents=3)
+    assert field.to_python_many(['A~;B;C', None, '', 'D']) == [['A;B', 'C'], [], [], ['D']]
+
+
+@pytest.mark.parametrize('oetype, raw', [
+    ('int', '1;x'),
+    ('dec', '1.5;abc'),
+    ('log', '1;yes'),
+    ('date', '01/02/2020;'),
+    ('date', '01/02'),
+    ('datetime', ';01/02/2020 10:00'),
+    ('datetime', '01/02/2020 1000'),
+    ('datetime', '01/02/2020 10:00:00:00'),
+])
+def test_invalid_values(oetype, raw):
+    field = OpenEdgeExtentField(OEtype=oetype, OEextents=2)
+    with pytest.raises(exceptions.ValidationError):
+        field.to_python(raw)
+    with pytest.raises(exceptions.ValidationError):
+        field.to_python_many([raw])
+
+
+@pytest.mark.parametrize('dateformat', ['mdy', 'dmy', 'ymd'])
+def test_date_round_trip(dateformat):
+    field = OpenEdgeExtentField(OEtype='date', OEextents=3, OEdateformat=dateformat)
+    values = [datetime.date(2020, 1, 31), None, datetime.date(1999, 12, 2)]
+    assert field.to_python(field.get_prep_value(values)) == values
+
+
+def test_datetime_round_trip():
+    field = OpenEdgeExtentField(OEtype='datetime', OEextents=2)
+    values = [datetime.datetime(2020, 1, 31, 23, 5, 9, 250000), datetime.datetime(2001, 2, 3)]
+    raw = field.get_prep_value(values)
+    assert raw == '01/31/2020 23:05:09.250;02/03/2001 00:00:00.000'
+    assert field.to_python(raw) == values
+
+
+def test_dates_written_in_connection_format():
+    class Connection(object):
+        date_format = 'dmy'
+    field = OpenEdgeExtentField(OEtype='date', OEextents=2)
+    raw = field.get_db_prep_save([datetime.date(2020, 1, 31), datetime.date(2020, 2, 1)], Connection())
+    assert raw == '31/01/2020;01/02/2020'
+    assert field.from_db_value(raw, None, Connection()) == [datetime.date(2020, 1, 31), datetime.date(2020, 2, 1)]
+
+
+def test_lazy_extents():
+    field = OpenEdgeExtentField(OEtype='char', OEextents=3, OElazy=True)
+    value = field.from_db_value('A~;B;C;D', None, None)
+    assert isinstance(value, LazyExtents)
+    assert not hasattr(value, 'items')
+    # Unchanged, written back as read
+    assert field.get_prep_value(value) == 'A~;B;C;D'
+    assert value == ['A;B', 'C', 'D'] and len(value) == 3
+    value[1] = 'E;F'
+    assert value.modified
+    assert field.get_prep_value(value) == 'A~;B;E~;F;D'
+    value.append('G')
+    assert list(value) == ['A;B', 'E;F', 'D', 'G']
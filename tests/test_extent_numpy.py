@@ -0,0 +1,75 @@
+# -*- coding: utf-8 -*-
+'''
+NumPy extents of OpenEdgeExtentField : to_matrix() parsing, the float64
+'dec' extents and the explicit Decimal (dtype=object) conversion.
+'''
+import decimal
+
+import pytest
+
+from django.core import exceptions
+
+np = pytest.importorskip('numpy')
+
+from django.db.backends.OpenEdge.OEmodels.OpenEdgeExtentField import OpenEdgeExtentField
+
+
+def test_int_matrix():
+    field = OpenEdgeExtentField(OEtype='int', OEextents=3)
+    matrix = field.to_matrix(['1;2;3', '4;?', None, '', '12345678901234567;0;-5'])
+    assert matrix.dtype == np.int64
+    assert matrix.tolist() == [[1, 2, 3], [4, 0, 0], [0, 0, 0], [0, 0, 0], [12345678901234567, 0, -5]]
+
+
+def test_empty_matrix():
+    field = OpenEdgeExtentField(OEtype='int64', OEextents=4)
+    assert field.to_matrix([]).shape == (0, 4)
+
+
+def test_dec_matrix_is_float():
+    field = OpenEdgeExtentField(OEtype='dec', OEextents=2)
+    matrix = field.to_matrix(['1.5;-2.25', '?'])
+    assert matrix.dtype == np.float64
+    assert matrix.tolist() == [[1.5, -2.25], [0.0, 0.0]]
+    matrix[0, 0] += 1
+    assert field.get_prep_value(matrix[0]) == '2.5;-2.25'
+
+
+def test_dec_object_matrix_is_exact():
+    field = OpenEdgeExtentField(OEtype='dec', OEextents=2)
+    matrix = field.to_matrix(['12345678901234567;0.1', '?'], dtype=object)
+    assert matrix.dtype == object
+    assert matrix.tolist() == [[decimal.Decimal('12345678901234567'), decimal.Decimal('0.1')],
+                               [decimal.Decimal(0), decimal.Decimal(0)]]
+    assert field.get_prep_value(matrix[0]) == '12345678901234567;0.1'
+
+
+def test_numpy_field_round_trip():
+    field = OpenEdgeExtentField(OEtype='dec', OEextents=3, OEnumpy=True)
+    value = field.to_python('1.10;?;-2')
+    assert value.tolist() == [1.1, 0.0, -2.0]
+    assert field.get_prep_value(value) == '1.1;0;-2'
+
+
+@pytest.mark.parametrize('oetype, raw', [
+    ('int', '1;x;3'),
+    ('int', '1.5;2;3'),
+    ('int', '1;;3'),
+    ('dec', '1;1e;3'),
+])
+def test_invalid_values(oetype, raw):
+    field = OpenEdgeExtentField(OEtype=oetype, OEextents=3)
+    with pytest.raises(exceptions.ValidationError):
+        field.to_matrix([raw])
+
+
+def test_too_many_extents():
+    field = OpenEdgeExtentField(OEtype='int', OEextents=2)
+    with pytest.raises(exceptions.ValidationError):
+        field.to_matrix(['1;2;3'])
+
+
+def test_invalid_object_values():
+    field = OpenEdgeExtentField(OEtype='dec', OEextents=2)
+    with pytest.raises(exceptions.ValidationError):
+        field.to_matrix(['1;abc'], dtype=object)
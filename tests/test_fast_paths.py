@@ -0,0 +1,71 @@
+# -*- coding: utf-8 -*-
+'''
+SQL of the exists(), count() and first() paths : TOP 1 without ORDER BY for
+the existence checks, a COUNT(*) subquery selecting the primary key only.
+The statements are captured instead of being executed.
+'''
+import pytest
+
+pytest.importorskip('pyodbc', exc_type=ImportError)
+
+from django.db import models  # noqa: E402
+from django.db.models.sql.constants import MULTI  # noqa: E402
+
+
+class FastCustomer(models.Model):
+    name = models.CharField(max_length=30)
+    city = models.CharField(max_length=30)
+    comments = models.TextField()
+
+    class Meta:
+        app_label = 'openedge_tests'
+        ordering = ['name']
+
+
+@pytest.fixture
+def statements(monkeypatch):
+    from django.db.backends.OpenEdge.compiler import SQLAggregateCompiler, SQLCompiler
+    executed = []
+
+    def execute_sql(self, result_type=MULTI, chunked_fetch=None, chunk_size=None):
+        sql, params = self.as_sql()
+        executed.append(sql + self.statement_hint_sql())
+        # No row, a count of 0
+        if isinstance(self, SQLAggregateCompiler):
+            return (0,)
+        return [] if result_type == MULTI else None
+
+    monkeypatch.setattr(SQLCompiler, 'execute_sql', execute_sql)
+    return executed
+
+
+def test_exists_is_unordered_top_1(statements):
+    assert FastCustomer.objects.filter(city='Boston').exists() is False
+    sql, = statements
+    assert sql.startswith('SELECT TOP 1 ')
+    assert 'ORDER BY' not in sql
+    assert '"comments"' not in sql
+
+
+def test_exists_with_explicit_ordering(statements):
+    FastCustomer.objects.order_by('-city').exists()
+    assert 'ORDER BY' not in statements[0]
+
+
+def test_count_of_a_slice_selects_the_primary_key(statements):
+    FastCustomer.objects.all()[:5].count()
+    sql, = statements
+    assert sql.startswith('SELECT COUNT(*) FROM (SELECT TOP 5 ')
+    assert '"comments"' not in sql and '"city"' not in sql
+
+
+def test_first_keeps_its_ordering(statements):
+    FastCustomer.objects.filter(city='Boston').first()
+    sql, = statements
+    assert sql.startswith('SELECT TOP 1 ')
+    assert 'ORDER BY "openedge_tests_fastcustomer"."name" ASC' in sql
+
+
+def test_exists_is_sent_with_the_query_hints(statements):
+    FastCustomer.objects.exists()
+    assert statements[0].endswith('WITH (NOLOCK)')
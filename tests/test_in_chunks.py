@@ -0,0 +1,112 @@
+# -*- coding: utf-8 -*-
+'''
+Oversized IN lookups split into several statements (IN_CHUNK_SIZE is 10 in
+the test settings, see openedge.py).
+'''
+import unicodedata
+
+import pytest
+
+pytest.importorskip('pyodbc', exc_type=ImportError)
+
+from django.db import models  # noqa: E402
+from django.db.models.sql.constants import MULTI  # noqa: E402
+
+
+class ChunkCustomer(models.Model):
+    name = models.CharField(max_length=30)
+
+    class Meta:
+        app_label = 'openedge_tests'
+        ordering = ['name']
+
+
+class ChunkOrder(models.Model):
+    customer = models.ForeignKey(ChunkCustomer, models.CASCADE)
+
+    class Meta:
+        app_label = 'openedge_tests'
+        ordering = ['customer__name']
+
+
+# Mixed case and accented names : the database collation does not order them
+# as the Python comparison does
+NAMES = ['delta', 'Alpha', 'kilo', 'écho', 'bravo', 'Lima', 'golf', 'hotel', 'India',
+         'juliett', 'Charlie', 'foxtrot', 'mike', 'november', 'Oscar', 'papa', 'quebec',
+         'romeo', 'Sierra', 'tango', 'uniform', 'Victor', 'whiskey', 'xray', 'Émile']
+ROWS = dict((pk, (pk, name)) for pk, name in enumerate(NAMES, 1))
+
+
+def collation_key(row):
+    """
+    Case and accent insensitive order of the name, as the database sorts it.
+    """
+    name = unicodedata.normalize('NFKD', row[1])
+    return ''.join(c for c in name if not unicodedata.combining(c)).casefold()
+
+
+def compiler_of(queryset):
+    return queryset.query.get_compiler('default')
+
+
+@pytest.fixture
+def statements(monkeypatch):
+    """
+    Runs the statements on ROWS, ordered as the database does.
+    """
+    from django.db.backends.OpenEdge.compiler import SQLCompiler
+    executed = []
+
+    def execute_sql(self, result_type=MULTI, chunked_fetch=None, chunk_size=None):
+        sql, params = self.as_sql()
+        executed.append(sql)
+        rows = [ROWS[pk] for pk in params if pk in ROWS]
+        if 'ORDER BY' in sql and '"name"' in sql.split('ORDER BY')[1]:
+            rows.sort(key=collation_key)
+        else:
+            rows.sort(reverse='DESC' in sql)
+        return [rows]
+
+    monkeypatch.setattr(SQLCompiler, 'execute_sql', execute_sql)
+    return executed
+
+
+def test_character_ordering_is_not_split():
+    compiler = compiler_of(ChunkCustomer.objects.filter(pk__in=range(1, 26)))
+    assert compiler.get_in_chunks(MULTI) is None
+
+
+def test_numeric_ordering_is_merged():
+    compiler = compiler_of(ChunkCustomer.objects.filter(pk__in=range(1, 26)).order_by('-pk'))
+    position, lookup, chunks, positions = compiler.get_in_chunks(MULTI)
+    assert [len(values) for values in chunks] == [10, 10, 5]
+    assert positions == [(0, True)]
+
+
+def test_unselected_ordering_is_not_split():
+    compiler = compiler_of(ChunkOrder.objects.filter(pk__in=range(1, 26)))
+    assert compiler.get_in_chunks(MULTI) is None
+
+
+def test_small_in_list_is_not_split():
+    compiler = compiler_of(ChunkCustomer.objects.filter(pk__in=range(1, 10)))
+    assert compiler.get_in_chunks(MULTI) is None
+
+
+def test_chunks_are_merged_in_order(statements):
+    compiler = compiler_of(ChunkCustomer.objects.filter(pk__in=range(1, 26)).order_by('-pk'))
+    blocks = compiler.execute_in_chunks(compiler.get_in_chunks(MULTI), MULTI, False, None)
+    rows = [row for block in blocks for row in block]
+    assert len(statements) == 3
+    assert rows == sorted(ROWS.values(), reverse=True)
+
+
+def test_character_ordering_keeps_the_collation(statements):
+    compiler = compiler_of(ChunkCustomer.objects.filter(pk__in=range(1, 26)))
+    # Not split : the database sorts the whole IN list with its collation
+    assert compiler.get_in_chunks(MULTI) is None
+    rows = [row for block in compiler.execute_sql(MULTI) for row in block]
+    assert len(statements) == 1
+    assert rows == sorted(ROWS.values(), key=collation_key)
+    # The Python comparison would give another order
+    assert rows != sorted(ROWS.values(), key=lambda row: row[1])
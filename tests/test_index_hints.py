@@ -0,0 +1,57 @@
+# -*- coding: utf-8 -*-
+'''
+INDEX table hints of the FROM clause (OEhints, OpenEdgeQuerySet.with_hints()).
+'''
+import pytest
+
+pytest.importorskip('pyodbc', exc_type=ImportError)
+
+from django.db import models  # noqa: E402
+from django.db.models import FilteredRelation, Q  # noqa: E402
+
+from django.db.backends.OpenEdge.OEmodels.OpenEdgeQuerySet import OpenEdgeManager  # noqa: E402
+
+
+class HintSalesRep(models.Model):
+    name = models.CharField(max_length=30)
+
+    class Meta:
+        app_label = 'openedge_tests'
+        # A quoted identifier holding the text of an ON clause
+        db_table = 'hint ON (rep'
+
+
+class HintCustomer(models.Model):
+    name = models.CharField(max_length=30)
+    rep = models.ForeignKey(HintSalesRep, models.CASCADE)
+
+    objects = OpenEdgeManager()
+
+    class Meta:
+        app_label = 'openedge_tests'
+
+
+def from_clause(queryset):
+    sql, params = queryset.query.get_compiler('default').as_sql()
+    return sql.split(' FROM ', 1)[1].split(' WHERE ', 1)[0]
+
+
+def test_base_table_hint_is_quoted():
+    sql = from_clause(HintCustomer.objects.with_hints(index='CustNum'))
+    assert sql == '"openedge_tests_hintcustomer" WITH (INDEX ("CustNum"))'
+
+
+def test_joined_table_hint_before_on_clause():
+    queryset = HintCustomer.objects.filter(rep__name='Smith').with_hints(index={'hint ON (rep': 'RepName'})
+    sql = from_clause(queryset)
+    assert sql == ('"openedge_tests_hintcustomer" INNER JOIN "hint ON (rep" WITH (INDEX ("RepName")) '
+                   'ON ("openedge_tests_hintcustomer"."rep_id" = "hint ON (rep"."id")')
+
+
+def test_filtered_relation_join_hint():
+    queryset = HintCustomer.objects.annotate(
+        smith=FilteredRelation('rep', condition=Q(rep__name='Smith')),
+    ).filter(smith__isnull=False).with_hints(index={'hint ON (rep': 'RepName'})
+    sql = from_clause(queryset)
+    assert ' "hint ON (rep" smith WITH (INDEX ("RepName")) ON (' in sql
+    assert sql.count('WITH (INDEX') == 1
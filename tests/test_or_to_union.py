@@ -0,0 +1,82 @@
+# -*- coding: utf-8 -*-
+'''
+OR to UNION rewrite (OpenEdgeQuerySet.or_to_union()) : the rewritten SQL
+must return the rows of the OR form. Both statements are run on a seeded
+SQLite table, the SQL of both dialects is the same for these queries.
+'''
+import sqlite3
+from collections import Counter
+
+import pytest
+
+pytest.importorskip('pyodbc', exc_type=ImportError)
+
+from django.db import models  # noqa: E402
+from django.db.models import Q  # noqa: E402
+
+from django.db.backends.OpenEdge.OEmodels.OpenEdgeQuerySet import OpenEdgeQuerySet  # noqa: E402
+
+
+class UnionCustomer(models.Model):
+    name = models.CharField(max_length=30)
+    city = models.CharField(max_length=30, null=True)
+    phone = models.CharField(max_length=30, null=True)
+
+    class Meta:
+        app_label = 'openedge_tests'
+
+
+ROWS = [
+    (1, 'Lift Tours', 'Boston', '555'),
+    (2, 'Lift Line', 'Boston', '777'),
+    (3, 'Urpon', 'Paris', '555'),
+    (4, 'Hoops', 'Paris', None),
+    (5, 'Go Fishing', None, '555'),
+    (6, 'Match Point', None, None),
+    (7, 'Lift Tours', 'Oslo', '555'),
+    (8, 'Chip', 'Boston', '999'),
+]
+
+
+@pytest.fixture(scope='module')
+def db():
+    db = sqlite3.connect(':memory:')
+    db.execute('CREATE TABLE "openedge_tests_unioncustomer" (id INTEGER PRIMARY KEY, name, city, phone)')
+    db.executemany('INSERT INTO "openedge_tests_unioncustomer" VALUES (?, ?, ?, ?)', ROWS)
+    yield db
+    db.close()
+
+
+def run(db, queryset):
+    sql, params = queryset.query.get_compiler('default').as_sql()
+    return sql, db.execute(sql.replace('%s', '?'), params).fetchall()
+
+
+QUERIES = [
+    lambda qs: qs.filter(Q(city='Boston') | Q(phone='555')),
+    lambda qs: qs.filter(Q(city='Boston') | Q(phone='555')).values_list('city'),
+    lambda qs: qs.filter(Q(city='Paris') | Q(phone='555') | Q(name__in=['Lift Tours', 'Chip'])).values_list('name', 'city'),
+    lambda qs: qs.filter(Q(city='Paris') | Q(phone='555')).values_list('city').distinct(),
+    lambda qs: qs.filter(Q(city='Boston') | Q(city__isnull=True), phone='555').values_list('phone'),
+    lambda qs: qs.filter(Q(pk__in=[]) | Q(phone='555')).values_list('phone'),
+    lambda qs: qs.filter(Q(city='Boston') | Q(phone='555')).values_list('city').order_by('city'),
+]
+
+
+@pytest.mark.parametrize('build', QUERIES)
+def test_same_rows_as_the_or_form(db, build):
+    queryset = build(OpenEdgeQuerySet(UnionCustomer))
+    or_sql, or_rows = run(db, queryset)
+    union_sql, union_rows = run(db, queryset.or_to_union())
+    assert 'UNION' not in or_sql
+    assert Counter(union_rows) == Counter(or_rows)
+    if queryset.query.order_by:
+        assert union_rows == or_rows
+
+
+def test_union_all_for_non_distinct_rows():
+    queryset = OpenEdgeQuerySet(UnionCustomer).filter(Q(city='Boston') | Q(phone='555'))
+    sql = queryset.values_list('city').or_to_union().query.get_compiler('default').as_sql()[0]
+    assert ' UNION ALL ' in sql and 'CASE WHEN' in sql
+    sql = queryset.or_to_union().query.get_compiler('default').as_sql()[0]
+    assert ' UNION ALL ' not in sql and 'CASE WHEN' not in sql
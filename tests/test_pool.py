@@ -0,0 +1,79 @@
+# -*- coding: utf-8 -*-
+'''
+Pooled connections (OPTIONS 'POOL', pool.py) seen from the DatabaseWrapper.
+'''
+import copy
+
+import pytest
+
+pytest.importorskip('pyodbc', exc_type=ImportError)
+
+from django.db import connections  # noqa: E402
+from django.db.backends.signals import connection_created  # noqa: E402
+
+from django.db.backends.OpenEdge import base, pool  # noqa: E402
+
+
+class FakeConnection(object):
+    autocommit = False
+
+    def __init__(self, connstr):
+        self.connstr = connstr
+        self.closed = False
+        self.rollbacks = 0
+
+    def rollback(self):
+        self.rollbacks += 1
+
+    def close(self):
+        self.closed = True
+
+
+@pytest.fixture
+def wrapper(monkeypatch):
+    monkeypatch.setattr(base.Database, 'connect', FakeConnection)
+    settings_dict = copy.deepcopy(connections['default'].settings_dict)
+    settings_dict['TYPECNX'] = {'DSN': 'pooltest'}
+    settings_dict['OPTIONS']['POOL'] = {'MAX_SIZE': 2, 'VALIDATE': False}
+    wrapper = connections['default'].__class__(settings_dict, alias='pooltest')
+    yield wrapper
+    wrapper.in_atomic_block = False
+    wrapper.close()
+    pool._pools.clear()
+
+
+def test_close_releases_to_pool(wrapper):
+    wrapper.connect()
+    connection = wrapper.connection
+    wrapper.close()
+    assert wrapper.connection is None
+    assert not connection.closed
+    assert wrapper.pool.get_stats()['idle'] == 1
+    wrapper.connect()
+    assert wrapper.connection is connection
+
+
+def test_close_in_atomic_block_discards(wrapper):
+    wrapper.connect()
+    connection = wrapper.connection
+    wrapper.in_atomic_block = True
+    wrapper.close()
+    # Kept by the wrapper until the block exits, never handed out again
+    assert wrapper.connection is connection
+    assert wrapper.closed_in_transaction
+    assert connection.closed
+    stats = wrapper.pool.get_stats()
+    assert stats['idle'] == 0 and stats['in_use'] == 0 and stats['size'] == 0
+
+
+def test_pooled_connection_sends_connection_created(wrapper):
+    sent = []
+
+    def receiver(sender, **kwargs):
+        sent.append(sender)
+    connection_created.connect(receiver)
+    try:
+        wrapper.get_new_connection(wrapper.get_connection_params())
+    finally:
+        connection_created.disconnect(receiver)
+    assert sent == [wrapper.__class__]
@@ -0,0 +1,84 @@
+# -*- coding: utf-8 -*-
+'''
+Sequence block allocation of the emulated auto-increment ids (operations.py).
+'''
+import pytest
+
+pytest.importorskip('pyodbc', exc_type=ImportError)
+
+from django.db import connections  # noqa: E402
+
+
+class SequenceCursor(object):
+    """
+    Answers the catalog and NEXTVAL queries of a sequence.
+    """
+    def __init__(self, increment, start=1):
+        self.increment = increment
+        self.value = start - increment
+        self.nextvals = 0
+        self.rows = []
+
+    def execute(self, sql, params=()):
+        if 'syscolumns' in sql:
+            self.rows = [('id',)]
+        elif 'syssequences' in sql:
+            self.rows = [('id_seqtest', self.increment)] if self.increment else []
+        else:
+            self.nextvals += 1
+            self.value += self.increment
+            self.rows = [(self.value,)]
+        return self
+
+    def fetchall(self):
+        return self.rows
+
+    def fetchone(self):
+        return self.rows[0]
+
+
+@pytest.fixture
+def ops():
+    connection = connections['default']
+    connection.owner = 'PUB'
+    ops = connection.ops
+    ops.table_metadata.clear()
+    ops.sequence_allocator.clear()
+    options = connection.settings_dict['OPTIONS']
+    options['SEQUENCE_BLOCK_SIZE'] = 10
+    yield ops
+    del options['SEQUENCE_BLOCK_SIZE']
+    ops.table_metadata.clear()
+    ops.sequence_allocator.clear()
+
+
+def test_blocks_follow_sequence_increment(ops):
+    cursor = SequenceCursor(10)
+    ids = ops.get_autoinc_keyvals('seqtest', 'id', 32, cursor, 25)
+    assert ids == list(range(1, 26))
+    assert cursor.nextvals == 3
+
+
+def test_existing_sequence_incrementing_by_one(ops):
+    # SEQUENCE_BLOCK_SIZE is 10 but the sequence was created with INCREMENT BY 1
+    cursor = SequenceCursor(1)
+    ids = ops.get_autoinc_keyvals('seqtest', 'id', 32, cursor, 3)
+    # Another process, without the reserved blocks of the first one
+    ops.sequence_allocator.clear()
+    ids += ops.get_autoinc_keyvals('seqtest', 'id', 32, cursor, 3)
+    assert sorted(ids) == [1, 2, 3, 4, 5, 6]
+    assert cursor.nextvals == 6
+
+
+def test_unknown_sequence_gives_one_id_per_nextval(ops):
+    cursor = SequenceCursor(0)
+    assert ops.sequence_increment('seqtest', cursor, 'PUB') == 1
+
+
+def test_ddl_clears_reserved_blocks(ops):
+    cursor = SequenceCursor(10)
+    ops.get_autoinc_keyvals('seqtest', 'id', 32, cursor, 1)
+    ops.sequence_allocator.clear(alias='default')
+    ops.table_metadata.clear('default')
+    cursor = SequenceCursor(10, start=500)
+    assert ops.get_autoinc_keyvals('seqtest', 'id', 32, cursor, 1) == [500]
@@ -0,0 +1,86 @@
+# -*- coding: utf-8 -*-
+'''
+Compiled SQL cache (OPTIONS 'SQL_CACHE_SIZE') : the key is a fingerprint of
+the WHERE clause, a cache hit does not compile the WHERE clause again.
+'''
+import pytest
+
+pytest.importorskip('pyodbc', exc_type=ImportError)
+
+from django.db import connections, models  # noqa: E402
+from django.db.models.sql.where import WhereNode  # noqa: E402
+
+
+class CacheCustomer(models.Model):
+    name = models.CharField(max_length=30)
+    city = models.CharField(max_length=30, null=True)
+    balance = models.IntegerField()
+
+    class Meta:
+        app_label = 'openedge_tests'
+
+
+@pytest.fixture
+def cache():
+    from django.db.backends.OpenEdge.base import SQLCache
+    connection = connections['default']
+    connection.sql_cache = SQLCache(16)
+    yield connection.sql_cache
+    connection.sql_cache = None
+
+
+def as_sql(queryset):
+    return queryset.query.get_compiler('default').as_sql()
+
+
+def uncached_sql(queryset):
+    return queryset.query.get_compiler('default').compile_query()
+
+
+def test_same_shape_is_a_hit(cache):
+    first = as_sql(CacheCustomer.objects.filter(city='Boston', balance__gt=10))
+    queryset = CacheCustomer.objects.filter(city='Paris', balance__gt=20)
+    second = as_sql(queryset)
+    assert (cache.misses, cache.hits) == (1, 1)
+    assert first[0] == second[0]
+    assert second == uncached_sql(queryset)
+    assert sorted(second[1], key=str) == [20, 'Paris']
+
+
+def test_hit_does_not_compile_the_where_clause(cache, monkeypatch):
+    from django.db.backends.OpenEdge.compiler import SQLCompiler
+    as_sql(CacheCustomer.objects.filter(name='A') | CacheCustomer.objects.exclude(city__isnull=True))
+    compiled = []
+    compile_ = SQLCompiler.compile
+
+    def compile(self, node, *args, **kwargs):
+        compiled.append(node)
+        return compile_(self, node, *args, **kwargs)
+    monkeypatch.setattr(SQLCompiler, 'compile', compile)
+    as_sql(CacheCustomer.objects.filter(name='B') | CacheCustomer.objects.exclude(city__isnull=True))
+    assert cache.hits == 1
+    assert not [node for node in compiled if isinstance(node, WhereNode)]
+
+
+@pytest.mark.parametrize('first, second', [
+    (dict(balance__in=[1, 2]), dict(balance__in=[1, 2, 3])),
+    (dict(city__isnull=True), dict(city__isnull=False)),
+    (dict(balance__gt=1), dict(balance__gte=1)),
+    (dict(name='A'), dict(city='A')),
+])
+def test_different_shapes_are_different_keys(cache, first, second):
+    for lookups in (first, second):
+        queryset = CacheCustomer.objects.filter(**lookups)
+        assert as_sql(queryset) == uncached_sql(queryset)
+    assert (cache.misses, cache.hits) == (2, 0)
+
+
+def test_negation_is_part_of_the_key(cache):
+    for queryset in (CacheCustomer.objects.filter(name='A'), CacheCustomer.objects.exclude(name='A')):
+        assert as_sql(queryset) == uncached_sql(queryset)
+    assert cache.hits == 0
+
+
+def test_expression_values_are_not_cached(cache):
+    as_sql(CacheCustomer.objects.filter(balance__gt=models.F('id')))
+    assert len(cache) == 0